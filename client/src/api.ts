@@ -0,0 +1,4 @@
+export const API_BASE_URL = 'http://localhost:8000';
+
+// The server sends audio links relative to itself, e.g. /audio/<key>?...
+export const resolveApiUrl = (path: string) => new URL(path, API_BASE_URL).toString();
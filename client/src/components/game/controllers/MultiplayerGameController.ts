@@ -2,11 +2,12 @@ import { useState, useEffect, useRef } from 'react';
 import { GameController } from '../interfaces';
 import { useRecording } from '../hooks';
 import { useWebSocket } from '../../../contexts/WebSocketContext';
+import { resolveApiUrl } from '../../../api';
 
 // Multiplayer controller that implements server-driven round system
 export const useMultiplayerGameController = (): GameController => {
     const recordingTimer = parseInt(localStorage.getItem('recordingTimer') || '30');
-    const { sendMessage, addMessageHandler } = useWebSocket();
+    const { uploadAudio, takeTransfer, addMessageHandler } = useWebSocket();
 
     // Server-synchronized state
     const [currentRound, setCurrentRound] = useState(1);
@@ -18,6 +19,9 @@ export const useMultiplayerGameController = (): GameController => {
     // Continuous timer for rounds after the first
     const [continuousTimeLeft, setContinuousTimeLeft] = useState(recordingTimer);
     const continuousTimerRef = useRef<NodeJS.Timeout | null>(null);
+    // Clip for an upcoming round, pushed by the server before the round starts
+    const prefetchedAudioRef = useRef<{ round: number; url: string | null } | null>(null);
+    const currentRoundRef = useRef(1);
 
     const recording = useRecording();
 
@@ -69,13 +73,31 @@ export const useMultiplayerGameController = (): GameController => {
         }
     };
 
-    // Helper function to process game summary files and convert base64 to URLs
-    const processGameSummaryFiles = (files: any[][]) => {
+    // Turn an audio reference into a playable URL: a signed server URL, base64
+    // data, or the id of a binary transfer that arrived ahead of the message
+    const createAudioUrl = (audio: string | null, audioTransport: string) => {
+        if (!audio) {
+            return null;
+        }
+        if (audioTransport === 'url') {
+            return resolveApiUrl(audio);
+        }
+        if (audioTransport === 'binary') {
+            const blob = takeTransfer(audio);
+            return blob ? URL.createObjectURL(blob) : null;
+        }
+        return createAudioUrlFromBase64(audio);
+    };
+
+    // Helper function to process game summary files and convert audio to URLs.
+    // Waveforms are passed through so results render before any audio loads
+    const processGameSummaryFiles = (files: any[][], audioTransport: string) => {
         return files.map(playerRounds => 
-            playerRounds.map(([playerId, originalFile, reversedFile]) => [
+            playerRounds.map(([playerId, originalFile, reversedFile, waveform]) => [
                 playerId,
-                originalFile ? createAudioUrlFromBase64(originalFile) : null,
-                reversedFile ? createAudioUrlFromBase64(reversedFile) : null
+                createAudioUrl(originalFile, audioTransport),
+                createAudioUrl(reversedFile, audioTransport),
+                waveform ?? null
             ])
         );
     };
@@ -85,21 +107,33 @@ export const useMultiplayerGameController = (): GameController => {
         const handleMessage = (response: any) => {
             console.log('🎮 MultiplayerGameController received message:', response);
             switch (response.type) {
+                case 'round_audio': {
+                    const url = createAudioUrl(response.audio, response.audio_transport);
+                    if (response.round_number === currentRoundRef.current) {
+                        // Arrived after its round started
+                        setCurrentReversedAudioUrl(url);
+                    } else {
+                        prefetchedAudioRef.current = { round: response.round_number, url };
+                    }
+                    break;
+                }
+
                 case 'game_round':
                     const roundNumber = response.round_number;
-                    const audioBase64 = response.audio;
                     
                     console.log('🎮 Received game_round:', roundNumber);
-                    console.log('🎮 Audio base64 length:', audioBase64?.length);
                     
-                    // Convert base64 audio to playable URL (this is the reversed audio)
-                    if (audioBase64) {
-                        const reversedAudioUrl = createAudioUrlFromBase64(audioBase64);
-                        setCurrentReversedAudioUrl(reversedAudioUrl);
+                    // Convert audio to playable URL (this is the reversed audio),
+                    // or use the clip that was pushed ahead of the round
+                    const prefetched = prefetchedAudioRef.current;
+                    if (response.audio_prefetched && prefetched?.round === roundNumber) {
+                        setCurrentReversedAudioUrl(prefetched.url);
                     } else {
-                        setCurrentReversedAudioUrl(null);
+                        setCurrentReversedAudioUrl(createAudioUrl(response.audio, response.audio_transport));
                     }
+                    prefetchedAudioRef.current = null;
                     
+                    currentRoundRef.current = roundNumber;
                     setCurrentRound(roundNumber);
                     setRoundInProgress(true);
                     
@@ -119,7 +153,7 @@ export const useMultiplayerGameController = (): GameController => {
                     setCurrentPhase('results');
                     // Process the 2D array and convert base64 to URLs
                     console.log('🎮 Received game summary files:', response.files);
-                    const processedFiles = processGameSummaryFiles(response.files || []);
+                    const processedFiles = processGameSummaryFiles(response.files || [], response.audio_transport);
                     console.log('🎮 Processed files with URLs:', processedFiles);
                     setGameSummaryFiles(processedFiles);
                     setRoundInProgress(false);
@@ -134,7 +168,7 @@ export const useMultiplayerGameController = (): GameController => {
         return () => {
             cleanup();
         };
-    }, [addMessageHandler, recordingTimer, recording]);
+    }, [addMessageHandler, takeTransfer, recordingTimer, recording]);
 
 
     const confirmRecording = async () => {
@@ -149,37 +183,10 @@ export const useMultiplayerGameController = (): GameController => {
         }
 
         try {
-            // Convert blob to base64 for transmission
-            const reader = new FileReader();
-            reader.onloadend = () => {
-                try {
-                    const base64Audio = reader.result as string;
-                    
-                    if (!base64Audio || !base64Audio.includes(',')) {
-                        console.error('🎤 Invalid base64 audio data');
-                        return;
-                    }
-                    
-                    // Send recording to server
-                    const message = {
-                        type: 'upload_file',
-                        round_number: currentRound,
-                        file_data: base64Audio.split(',')[1], // Remove data:audio/wav;base64, prefix
-                    };
-                    
-                    sendMessage(message);
-                } catch (error) {
-                    console.error('🎤 Error processing audio data:', error);
-                }
-            };
-            
-            reader.onerror = (error) => {
-                console.error('🎤 FileReader error:', error);
-            };
-            
-            reader.readAsDataURL(recording.recordedAudio);
+            // Send recording to server using the negotiated transport
+            const audio = recording.recordedAudio;
             recording.resetRecording(recordingTimer);
-            
+            await uploadAudio(currentRound, audio);
         } catch (error) {
             console.error('🎤 Error in confirmRecording:', error);
         }
@@ -1,4 +1,5 @@
 import { useState, useRef, useEffect } from 'react';
+import { resolveApiUrl } from '../../../api';
 
 // Generic recording hook that can be used by any game type
 export const useRecording = () => {
@@ -83,7 +84,7 @@ export const useRecording = () => {
             const formData = new FormData();
             formData.append('file', audioBlob, 'recording.webm');
 
-            const response = await fetch('http://localhost:8000/reverse/', {
+            const response = await fetch(resolveApiUrl('/reverse/'), {
                 method: 'POST',
                 body: formData,
             });
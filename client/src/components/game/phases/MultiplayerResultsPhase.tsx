@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { Card, Typography, Button, Space, Tabs, Avatar, Divider } from 'antd';
 import { SoundOutlined, HomeOutlined, UserOutlined, TrophyOutlined } from '@ant-design/icons';
+import Waveform from '../../shared/Waveform';
 
 const { Title, Text } = Typography;
 
@@ -55,11 +56,15 @@ const MultiplayerResultsPhase: React.FC<MultiplayerResultsPhaseProps> = ({
     // Just go through their progression in order
     const playerProgression = gameSummaryFiles[creatorInfo.progressionIndex];
     const clipProgression = playerProgression.map((entry, roundIndex) => {
-      const [playerId, originalFile, reversedFile] = entry;
+      const [playerId, originalFile, reversedFile, waveform] = entry;
+      // The waveform is the original's; the reversed clip's is its mirror image
+      const peaks: number[] | null = waveform ?? null;
       return {
         round: roundIndex + 1,
         originalFile,
         reversedFile,
+        originalPeaks: peaks,
+        reversedPeaks: peaks && [...peaks].reverse(),
         playerId,
         isOriginalCreator: roundIndex === 0
       };
@@ -109,44 +114,50 @@ const MultiplayerResultsPhase: React.FC<MultiplayerResultsPhaseProps> = ({
                 </Text>
               </div>
               
-              <Space size={12}>
+              <Space size={12} wrap>
                 {entry.originalFile && (
-                  <Button
-                    onClick={() => entry.originalFile && onPlayAudio(entry.originalFile)}
-                    icon={<SoundOutlined />}
-                    size="middle"
-                    style={{
-                      background: 'linear-gradient(135deg, #8b5cf6 0%, #7c3aed 100%)',
-                      border: 'none',
-                      color: 'white',
-                      borderRadius: '10px',
-                      height: '40px',
-                      padding: '0 20px',
-                      fontSize: '15px',
-                      fontWeight: '500'
-                    }}
-                  >
-                    🎵 Original
-                  </Button>
+                  <Space size={8}>
+                    <Button
+                      onClick={() => entry.originalFile && onPlayAudio(entry.originalFile)}
+                      icon={<SoundOutlined />}
+                      size="middle"
+                      style={{
+                        background: 'linear-gradient(135deg, #8b5cf6 0%, #7c3aed 100%)',
+                        border: 'none',
+                        color: 'white',
+                        borderRadius: '10px',
+                        height: '40px',
+                        padding: '0 20px',
+                        fontSize: '15px',
+                        fontWeight: '500'
+                      }}
+                    >
+                      🎵 Original
+                    </Button>
+                    {entry.originalPeaks && <Waveform peaks={entry.originalPeaks} color="#8b5cf6" />}
+                  </Space>
                 )}
                 {entry.reversedFile && (
-                  <Button
-                    onClick={() => entry.reversedFile && onPlayAudio(entry.reversedFile)}
-                    icon={<SoundOutlined />}
-                    size="middle"
-                    style={{
-                      background: 'linear-gradient(135deg, #f59e0b 0%, #d97706 100%)',
-                      border: 'none',
-                      color: 'white',
-                      borderRadius: '10px',
-                      height: '40px',
-                      padding: '0 20px',
-                      fontSize: '15px',
-                      fontWeight: '500'
-                    }}
-                  >
-                    🔄 Reversed
-                  </Button>
+                  <Space size={8}>
+                    <Button
+                      onClick={() => entry.reversedFile && onPlayAudio(entry.reversedFile)}
+                      icon={<SoundOutlined />}
+                      size="middle"
+                      style={{
+                        background: 'linear-gradient(135deg, #f59e0b 0%, #d97706 100%)',
+                        border: 'none',
+                        color: 'white',
+                        borderRadius: '10px',
+                        height: '40px',
+                        padding: '0 20px',
+                        fontSize: '15px',
+                        fontWeight: '500'
+                      }}
+                    >
+                      🔄 Reversed
+                    </Button>
+                    {entry.reversedPeaks && <Waveform peaks={entry.reversedPeaks} color="#f59e0b" />}
+                  </Space>
                 )}
               </Space>
             </Card>
@@ -49,6 +49,11 @@ const MultiplayerLobby: React.FC = () => {
       console.log('🎮 MultiplayerLobby received message:', response);
       if (response.type === 'room_created' || response.type === 'room_joined' || response.type === 'room_updated') {
         setRoomData(response.room);
+      } else if (response.type === 'session_resumed') {
+        // Reconnected; the room is only included if it changed meanwhile
+        if (response.room) {
+          setRoomData(response.room);
+        }
       } else if (response.type === 'game_round') {
         message.success('Game starting!');
         // Store player info in localStorage for the game
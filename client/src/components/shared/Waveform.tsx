@@ -0,0 +1,45 @@
+import React from 'react';
+
+interface WaveformProps {
+    // Peak amplitude of equal slices of the clip, 0-255, as sent by the server
+    peaks: number[];
+    width?: number;
+    height?: number;
+    color?: string;
+}
+
+const Waveform: React.FC<WaveformProps> = ({
+    peaks,
+    width = 160,
+    height = 32,
+    color = '#8b5cf6'
+}) => {
+    if (peaks.length === 0) {
+        return null;
+    }
+    // Scale to the loudest slice so quiet recordings still show their shape
+    const loudest = Math.max(...peaks, 1);
+    const slot = width / peaks.length;
+    const barWidth = Math.max(slot * 0.6, 1);
+
+    return (
+        <svg width={width} height={height} aria-hidden="true" style={{ display: 'block' }}>
+            {peaks.map((peak, index) => {
+                const barHeight = Math.max((peak / loudest) * height, 1);
+                return (
+                    <rect
+                        key={index}
+                        x={index * slot + (slot - barWidth) / 2}
+                        y={(height - barHeight) / 2}
+                        width={barWidth}
+                        height={barHeight}
+                        rx={barWidth / 2}
+                        fill={color}
+                    />
+                );
+            })}
+        </svg>
+    );
+};
+
+export default Waveform;
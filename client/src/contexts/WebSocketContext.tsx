@@ -1,12 +1,45 @@
 import React, { createContext, useContext, useEffect, useRef, useState, ReactNode } from 'react';
 import { message } from 'antd';
 
+export type AudioTransport = 'base64' | 'binary' | 'url';
+
 interface WebSocketContextType {
   isConnected: boolean;
+  audioTransport: AudioTransport;
   sendMessage: (message: any) => void;
+  uploadAudio: (roundNumber: number, audio: Blob) => Promise<void>;
+  takeTransfer: (transferId: string) => Blob | null;
   addMessageHandler: (handler: (data: any) => void) => () => void;
 }
 
+// A binary download in progress: its header has arrived and frames are pending
+interface PendingTransfer {
+  transferId: string;
+  size: number;
+  received: number;
+  frames: ArrayBuffer[];
+}
+
+// What a dropped connection needs to resume as the same player
+interface SessionState {
+  token: string;
+  roomVersion: number;
+  roundNumber: number | null;
+}
+
+const SESSION_STORAGE_KEY = 'retronome.session';
+const RECONNECT_BASE_DELAY_MS = 500;
+const RECONNECT_MAX_DELAY_MS = 15000;
+
+const loadSession = (): SessionState | null => {
+  try {
+    const stored = sessionStorage.getItem(SESSION_STORAGE_KEY);
+    return stored ? JSON.parse(stored) : null;
+  } catch {
+    return null;
+  }
+};
+
 const WebSocketContext = createContext<WebSocketContextType | null>(null);
 
 interface WebSocketProviderProps {
@@ -18,6 +51,90 @@ export const WebSocketProvider: React.FC<WebSocketProviderProps> = ({ children }
   const [ws, setWs] = useState<WebSocket | null>(null);
   const wsRef = useRef<WebSocket | null>(null); // For cleanup only
   const messageHandlersRef = useRef<Set<(data: any) => void>>(new Set());
+  const [audioTransport, setAudioTransport] = useState<AudioTransport>('base64');
+  const maxFrameSizeRef = useRef(64 * 1024);
+  const pendingTransferRef = useRef<PendingTransfer | null>(null);
+  const transfersRef = useRef<Map<string, Blob>>(new Map());
+  const sessionRef = useRef<SessionState | null>(loadSession());
+  const reconnectAttemptsRef = useRef(0);
+  const reconnectTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
+  const unmountingRef = useRef(false);
+
+  const saveSession = (session: SessionState | null) => {
+    sessionRef.current = session;
+    if (session) {
+      sessionStorage.setItem(SESSION_STORAGE_KEY, JSON.stringify(session));
+    } else {
+      sessionStorage.removeItem(SESSION_STORAGE_KEY);
+    }
+  };
+
+  // Remember the session token and what this client has seen, so a reconnect
+  // only has to fetch what it missed
+  const trackSession = (data: any) => {
+    const session = sessionRef.current;
+    switch (data.type) {
+      case 'room_created':
+      case 'room_joined':
+        if (data.session_token) {
+          saveSession({ token: data.session_token, roomVersion: data.room.version, roundNumber: null });
+        }
+        break;
+      case 'session_resumed':
+        saveSession({
+          token: data.session_token,
+          roomVersion: data.room ? data.room.version : session?.roomVersion ?? 0,
+          roundNumber: session?.roundNumber ?? null,
+        });
+        break;
+      case 'room_updated':
+        if (session) saveSession({ ...session, roomVersion: data.room.version });
+        break;
+      case 'game_round':
+        if (session) saveSession({ ...session, roundNumber: data.round_number });
+        break;
+      case 'game_summary':
+        if (session) saveSession({ ...session, roundNumber: null });
+        break;
+      case 'room_left':
+        saveSession(null);
+        break;
+      case 'error':
+        if (data.error === 'Session expired') saveSession(null);
+        break;
+    }
+  };
+
+  const scheduleReconnect = () => {
+    if (unmountingRef.current || reconnectTimerRef.current) return;
+    // Exponential backoff with jitter so a dropped network doesn't bring every
+    // client back at the same instant
+    const attempt = reconnectAttemptsRef.current++;
+    const delay = Math.min(RECONNECT_MAX_DELAY_MS, RECONNECT_BASE_DELAY_MS * 2 ** attempt) * (0.5 + Math.random());
+    reconnectTimerRef.current = setTimeout(() => {
+      reconnectTimerRef.current = null;
+      connectWebSocket();
+    }, delay);
+  };
+
+  const completeTransferIfDone = () => {
+    const pending = pendingTransferRef.current;
+    if (pending && pending.received >= pending.size) {
+      transfersRef.current.set(pending.transferId, new Blob(pending.frames, { type: 'audio/webm' }));
+      pendingTransferRef.current = null;
+    }
+  };
+
+  const handleBinaryFrame = (frame: ArrayBuffer) => {
+    const pending = pendingTransferRef.current;
+    if (!pending) {
+      console.error('❌ Received binary frame without a transfer header');
+      return;
+    }
+    pending.frames.push(frame);
+    pending.received += frame.byteLength;
+    completeTransferIfDone();
+  };
 
   const connectWebSocket = () => {
     // Close existing connection if any
@@ -28,19 +145,54 @@ export const WebSocketProvider: React.FC<WebSocketProviderProps> = ({ children }
     try {
       console.log('Creating new WebSocket connection...');
       const newWs = new WebSocket('ws://localhost:8000/game/');
+      newWs.binaryType = 'arraybuffer';
       
       newWs.onopen = () => {
         console.log('WebSocket connected');
         setIsConnected(true);
         setWs(newWs);
         wsRef.current = newWs; // Keep ref for cleanup
+        // Upload raw binary frames and download audio over HTTP instead of
+        // base64-in-JSON
+        newWs.send(JSON.stringify({ type: 'negotiate', audio_transport: 'url' }));
+        reconnectAttemptsRef.current = 0;
+        const session = sessionRef.current;
+        if (session) {
+          newWs.send(JSON.stringify({
+            type: 'resume_session',
+            session_token: session.token,
+            room_version: session.roomVersion,
+            round_number: session.roundNumber,
+          }));
+        }
       };
 
       newWs.onmessage = (event) => {
+        if (event.data instanceof ArrayBuffer) {
+          handleBinaryFrame(event.data);
+          return;
+        }
         try {
           console.log('📥 RAW MESSAGE RECEIVED:', event.data);
           const data = JSON.parse(event.data);
           console.log('✅ PARSED MESSAGE:', data);
+
+          if (data.type === 'protocol_negotiated') {
+            setAudioTransport(data.audio_transport);
+            maxFrameSizeRef.current = data.max_frame_size;
+            return;
+          }
+          trackSession(data);
+          if (data.type === 'audio_transfer') {
+            pendingTransferRef.current = {
+              transferId: data.transfer_id,
+              size: data.size,
+              received: 0,
+              frames: [],
+            };
+            completeTransferIfDone();
+            return;
+          }
           
           // Notify all registered handlers
           messageHandlersRef.current.forEach(handler => {
@@ -70,7 +222,8 @@ export const WebSocketProvider: React.FC<WebSocketProviderProps> = ({ children }
         
         // Only show warning for unexpected closes (not clean shutdowns)
         if (event.code !== 1000) {
-          message.warning('Connection lost');
+          message.warning('Connection lost, reconnecting...');
+          scheduleReconnect();
         }
       };
     } catch (error) {
@@ -78,14 +231,20 @@ export const WebSocketProvider: React.FC<WebSocketProviderProps> = ({ children }
       setIsConnected(false);
       setWs(null);
       wsRef.current = null;
+      scheduleReconnect();
     }
   };
 
   useEffect(() => {
+    unmountingRef.current = false;
     connectWebSocket();
 
     return () => {
       console.log('🧹 Cleaning up WebSocket connection...');
+      unmountingRef.current = true;
+      if (reconnectTimerRef.current) {
+        clearTimeout(reconnectTimerRef.current);
+      }
       // Use ref for cleanup to avoid stale closure
       if (wsRef.current && wsRef.current.readyState !== WebSocket.CLOSED) {
         try {
@@ -125,6 +284,51 @@ export const WebSocketProvider: React.FC<WebSocketProviderProps> = ({ children }
     }
   };
 
+  const blobToBase64 = (blob: Blob): Promise<string> =>
+    new Promise((resolve, reject) => {
+      const reader = new FileReader();
+      reader.onloadend = () => {
+        const dataUrl = reader.result as string;
+        if (!dataUrl || !dataUrl.includes(',')) {
+          reject(new Error('Invalid base64 audio data'));
+          return;
+        }
+        resolve(dataUrl.split(',')[1]); // Remove data:audio/webm;base64, prefix
+      };
+      reader.onerror = () => reject(reader.error);
+      reader.readAsDataURL(blob);
+    });
+
+  // Upload a recording using the negotiated transport
+  const uploadAudio = async (roundNumber: number, audio: Blob) => {
+    if (audioTransport === 'base64') {
+      sendMessage({
+        type: 'upload_file',
+        round_number: roundNumber,
+        file_data: await blobToBase64(audio),
+      });
+      return;
+    }
+
+    if (!ws || ws.readyState !== WebSocket.OPEN) {
+      console.error('❌ WebSocket is not connected');
+      message.error('Not connected to server');
+      return;
+    }
+    const buffer = await audio.arrayBuffer();
+    ws.send(JSON.stringify({ type: 'upload_start', round_number: roundNumber, size: buffer.byteLength }));
+    for (let offset = 0; offset < buffer.byteLength; offset += maxFrameSizeRef.current) {
+      ws.send(buffer.slice(offset, offset + maxFrameSizeRef.current));
+    }
+  };
+
+  // Claim a completed binary download referenced by a game message
+  const takeTransfer = (transferId: string): Blob | null => {
+    const blob = transfersRef.current.get(transferId) ?? null;
+    transfersRef.current.delete(transferId);
+    return blob;
+  };
+
   const addMessageHandler = (handler: (data: any) => void) => {
     messageHandlersRef.current.add(handler);
     
@@ -136,7 +340,10 @@ export const WebSocketProvider: React.FC<WebSocketProviderProps> = ({ children }
 
   const contextValue: WebSocketContextType = {
     isConnected,
+    audioTransport,
     sendMessage,
+    uploadAudio,
+    takeTransfer,
     addMessageHandler,
   };
 
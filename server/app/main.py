@@ -1,9 +1,48 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.routers import all_routers
+from clients import close_s3_client
+from game_core import (
+    close_metrics,
+    configure_logging,
+    get_audio_sweeper,
+    get_pubsub_hub,
+    get_reversal_engine,
+    get_room_code_pool,
+    get_round_scheduler,
+    get_session_manager,
+)
+
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    reversal_engine = get_reversal_engine()
+    reversal_engine.start()
+    round_scheduler = get_round_scheduler()
+    round_scheduler.start()
+    audio_sweeper = get_audio_sweeper()
+    audio_sweeper.start()
+    room_code_pool = get_room_code_pool()
+    room_code_pool.start()
+    session_manager = get_session_manager()
+    session_manager.start()
+    yield
+    await session_manager.stop()
+    await room_code_pool.stop()
+    await audio_sweeper.stop()
+    await round_scheduler.stop()
+    reversal_engine.shutdown()
+    await get_pubsub_hub().close()
+    await close_s3_client()
+    close_metrics()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
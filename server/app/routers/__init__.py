@@ -1,9 +1,15 @@
+from .audio import router as audio_router
 from .game import router as one_versus_one_router
+from .metrics import router as metrics_router
 from .reverse import router as items_router
+from .storage import router as storage_router
 from .test import router as test_router
 
 all_routers = [
     items_router,
     test_router,
     one_versus_one_router,
+    audio_router,
+    storage_router,
+    metrics_router,
 ]
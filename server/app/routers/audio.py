@@ -0,0 +1,56 @@
+import os
+import time
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse
+
+from game_core import LocalStorage, get_storage, verify_audio_signature
+
+router = APIRouter()
+
+storage = get_storage()
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return etag in candidates or '*' in candidates
+
+
+@router.api_route('/audio/{file_key}', methods=['GET', 'HEAD'])
+async def audio(request: Request, file_key: str, expires: int, signature: str):
+    if not verify_audio_signature(file_key, expires, signature):
+        raise HTTPException(status_code=403, detail='Invalid or expired audio URL')
+    max_age = max(0, expires - int(time.time()))
+
+    if not isinstance(storage, LocalStorage):
+        # Let the client fetch the object straight from the bucket
+        try:
+            url = await storage.download_url(file_key, max_age)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail='Audio not found') from e
+        return RedirectResponse(
+            url,
+            status_code=307,
+            headers={'Cache-Control': f'private, max-age={max_age}'},
+        )
+
+    try:
+        path = storage.path(file_key)
+        stat = os.stat(path)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail='Audio not found') from e
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        'Cache-Control': f'private, max-age={max_age}',
+        'ETag': etag,
+    }
+    if _etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse streams the file and answers Range requests with 206
+    return FileResponse(
+        path, media_type='audio/webm', headers=headers, stat_result=stat
+    )
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, WebSocket
+import logging
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from game_core import GameController
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 @router.websocket('/game/')
@@ -10,8 +13,12 @@ async def game(websocket: WebSocket):
     await websocket.accept()
     controller = GameController(websocket)
     try:
-        print('New WebSocket connection established')
+        logger.debug('New WebSocket connection established')
         await controller.run()
-    except Exception as e:
-        print(f'WebSocket connection closed with error: {e}')
+    except WebSocketDisconnect as e:
+        logger.debug('WebSocket connection closed with code %s', e.code)
+    except Exception:
+        logger.exception('WebSocket connection closed with error')
         await websocket.close()
+    finally:
+        await controller.close()
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from config import METRICS_ENABLED
+from game_core import render_metrics
+
+router = APIRouter()
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail='Metrics are disabled')
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE_LATEST)
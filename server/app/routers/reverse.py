@@ -1,22 +1,164 @@
-import io
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
 
-from fastapi import APIRouter, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.background import BackgroundTask
 
-from game_core import reverse_audio
+from config import MAX_UPLOAD_BYTES
+from game_core import ReversalError, ReversalTimeoutError, get_reversal_cache
 
 router = APIRouter()
 
+# Room for the multipart boundaries and part headers around the file
+MAX_FORM_OVERHEAD = 16 * 1024
+
+
+class _FileField:
+    """
+    python-multipart callbacks that collect the data of the form field `name`.
+    Data parsed from each body chunk waits in `pending` until it is written.
+    """
+
+    def __init__(self, name: bytes):
+        self.name = name
+        self.found = False
+        self.pending: list[bytes] = []
+        self._in_field = False
+        self._header_field = b''
+        self._header_value = b''
+
+    def callbacks(self) -> dict:
+        return {
+            'on_part_begin': self._on_part_begin,
+            'on_header_field': self._on_header_field,
+            'on_header_value': self._on_header_value,
+            'on_header_end': self._on_header_end,
+            'on_part_data': self._on_part_data,
+            'on_part_end': self._on_part_end,
+        }
+
+    def _on_part_begin(self) -> None:
+        self._in_field = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_field.lower() == b'content-disposition':
+            _, params = parse_options_header(self._header_value)
+            self._in_field = params.get(b'name') == self.name
+        self._header_field = self._header_value = b''
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self.pending.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_field:
+            self.found = True
+            self._in_field = False
+
+
+def _content_length(request: Request) -> int | None:
+    value = request.headers.get('content-length')
+    if value is None:
+        return None
+    if not (value.isascii() and value.isdigit()):
+        raise HTTPException(status_code=400, detail='Invalid Content-Length')
+    return int(value)
+
+
+async def spool_upload(request: Request, path: str) -> 'hashlib._Hash':
+    """
+    Stream the `file` field of a multipart body to `path`, hashing it on the
+    way. The body is parsed as it arrives rather than buffered by FastAPI
+    first, so an oversized upload is rejected once it exceeds
+    MAX_UPLOAD_BYTES instead of after it has been received.
+    """
+    max_body = MAX_UPLOAD_BYTES + MAX_FORM_OVERHEAD
+    content_length = _content_length(request)
+    if content_length is not None and content_length > max_body:
+        raise HTTPException(status_code=413, detail='Upload is too large')
+    content_type, params = parse_options_header(request.headers.get('content-type'))
+    boundary = params.get(b'boundary')
+    if content_type != b'multipart/form-data' or not boundary:
+        raise HTTPException(status_code=400, detail='Expected a multipart upload')
+
+    field = _FileField(b'file')
+    digest = hashlib.sha256()
+    received = size = 0
+    try:
+        parser = MultipartParser(boundary, field.callbacks())
+        with open(path, 'wb') as f:
+            # Also bounds chunked bodies, which have no Content-Length
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > max_body:
+                    raise HTTPException(status_code=413, detail='Upload is too large')
+                parser.write(chunk)
+                if not field.pending:
+                    continue
+                data = b''.join(field.pending)
+                field.pending.clear()
+                size += len(data)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail='Upload is too large')
+                digest.update(data)
+                await asyncio.to_thread(f.write, data)
+        parser.finalize()
+    except FormParserError as e:
+        raise HTTPException(status_code=400, detail='Malformed multipart body') from e
+    if not field.found:
+        raise HTTPException(status_code=400, detail='Missing file field')
+    if size == 0:
+        raise HTTPException(status_code=400, detail='Upload is empty')
+    return digest
+
 
 @router.post('/reverse/')
-async def reverse(file: UploadFile):
-    file_bytes = await file.read()
-    reversed_bytes = reverse_audio(
-        file_bytes, input_format='webm', output_format='webm'
-    )
-    output_io = io.BytesIO(reversed_bytes)
-    return StreamingResponse(
-        output_io,
+async def reverse(request: Request):
+    work_dir = tempfile.mkdtemp(prefix='reverse-')
+    cleanup = BackgroundTask(shutil.rmtree, work_dir, ignore_errors=True)
+    input_path = os.path.join(work_dir, 'input.webm')
+    output_path = os.path.join(work_dir, 'output.webm')
+    try:
+        digest = await spool_upload(request, input_path)
+        cache = get_reversal_cache()
+        await cache.reverse_file(
+            cache.key_from_digest(digest, 'webm', 'webm'),
+            input_path,
+            output_path,
+            input_format='webm',
+            output_format='webm',
+        )
+    except ReversalTimeoutError as e:
+        await cleanup()
+        raise HTTPException(status_code=504, detail='Audio reversal timed out') from e
+    except ReversalError as e:
+        await cleanup()
+        raise HTTPException(status_code=422, detail='Could not process audio') from e
+    except BaseException:
+        await cleanup()
+        raise
+
+    # FileResponse streams the file in chunks and sets Content-Length
+    return FileResponse(
+        output_path,
         media_type='audio/webm',
         headers={'Content-Disposition': 'inline'},
+        background=cleanup,
     )
+
+
+@router.get('/reverse/cache')
+async def reverse_cache_stats():
+    return get_reversal_cache().stats()
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+
+from game_core import FileManager, get_audio_sweeper, get_storage
+
+router = APIRouter()
+
+
+@router.get('/storage/stats')
+async def storage_stats():
+    return {
+        'backend': get_storage().name,
+        'free_bytes': await get_storage().free_bytes(),
+        'sweeper': get_audio_sweeper().stats(),
+        'encoding': FileManager.encoding_stats(),
+    }
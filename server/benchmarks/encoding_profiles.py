@@ -0,0 +1,58 @@
+"""
+Compare the encoding profiles on the bundled webm fixtures.
+
+For each profile and clip, reports the size of what save_round_file stores
+(the forward clip and its reversal) against the upload, and how long the
+single decode plus both encodes and the waveform take.
+
+    python -m benchmarks.encoding_profiles --backend pyav
+"""
+
+import argparse
+import statistics
+import time
+
+from game_core.reverse_audio import BACKENDS, PROFILES, get_backend
+
+from .make_fixtures import CLIP_SECONDS, fixture_path
+
+
+def measure(backend_name: str, profile_name: str, seconds: int, iterations: int):
+    with open(fixture_path(seconds), 'rb') as f:
+        file_bytes = f.read()
+    backend = get_backend(backend_name)
+    profile = PROFILES[profile_name]
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        forward, reversed_, _ = backend.transcode(file_bytes, 'webm', 'webm', profile)
+        latencies.append(time.perf_counter() - start)
+    return len(file_bytes), len(forward), len(reversed_), statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='pyav')
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES))
+    parser.add_argument('--clips', nargs='+', type=int, default=CLIP_SECONDS)
+    parser.add_argument('--iterations', type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f'{"profile":<9} {"clip":>5} {"upload":>9} {"stored":>9} '
+        f'{"reversed":>9} {"savings":>8} {"p50 ms":>8}'
+    )
+    for profile_name in args.profiles:
+        for seconds in args.clips:
+            upload, forward, reversed_, p50 = measure(
+                args.backend, profile_name, seconds, args.iterations
+            )
+            savings = 1 - (forward + reversed_) / (2 * upload)
+            print(
+                f'{profile_name:<9} {seconds:>4}s {upload:>9} {forward:>9} '
+                f'{reversed_:>9} {savings:>8.1%} {p50 * 1000:>8.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Regenerate the bundled webm fixtures used by the benchmarks.
+
+The clips are synthetic and voice-like (a pitch-gliding harmonic tone with a
+syllable-rate envelope and a little noise), encoded the way browsers'
+MediaRecorder produces them: mono 48 kHz Opus in a WebM container.
+
+    python -m benchmarks.make_fixtures
+"""
+
+import os
+
+import numpy as np
+
+from game_core.reverse_audio import PyAVBackend
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+CLIP_SECONDS = [1, 5, 10, 30]
+
+
+def fixture_path(seconds: int) -> str:
+    return os.path.join(FIXTURES_DIR, f'voice_{seconds}s.webm')
+
+
+def synthesize(seconds: int, sample_rate: int = PyAVBackend.SAMPLE_RATE) -> np.ndarray:
+    rng = np.random.default_rng(seconds)
+    t = np.arange(seconds * sample_rate) / sample_rate
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * 3 * t), 0, None) ** 2
+    signal = 0.3 * voice * envelope + 0.01 * rng.standard_normal(len(t))
+    return signal.astype(np.float32).reshape(-1, 1)
+
+
+def main():
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    backend = PyAVBackend()
+    for seconds in CLIP_SECONDS:
+        data = backend.encode(synthesize(seconds), 'mono', 'webm')
+        with open(fixture_path(seconds), 'wb') as f:
+            f.write(data)
+        print(f'{fixture_path(seconds)}: {len(data)} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Messages per second on one core for parsing each request type and encoding the
+main notifications, comparing the previous path (json.loads, a lookup by
+`type`, then the model constructor; model_dump then json.dumps on the way out)
+with the discriminated-union TypeAdapter and model_dump_json used now.
+
+    python -m benchmarks.message_dispatch --seconds 0.5
+"""
+
+import argparse
+import base64
+import json
+import time
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+from config import WAVEFORM_BUCKETS
+from game_core.audio_urls import sign_audio_url
+from models.request_schemas import (
+    CreateRoomRequest,
+    JoinRoomRequest,
+    LeaveRoomRequest,
+    NegotiateRequest,
+    RequestType,
+    StartGameRequest,
+    UploadFileRequest,
+    UploadStartRequest,
+    request_message_adapter,
+)
+from models.response_schemas import (
+    GameRoundNotification,
+    GameSummaryNotification,
+    RoomUpdatedNotification,
+)
+from models.room import RoomModel
+from models.types import AudioTransport
+
+from .make_fixtures import fixture_path
+
+LEGACY_SCHEMAS = {
+    RequestType.CREATE_ROOM: CreateRoomRequest,
+    RequestType.JOIN_ROOM: JoinRoomRequest,
+    RequestType.START_GAME: StartGameRequest,
+    RequestType.UPLOAD_FILE: UploadFileRequest,
+    RequestType.UPLOAD_START: UploadStartRequest,
+    RequestType.LEAVE_ROOM: LeaveRoomRequest,
+    RequestType.NEGOTIATE: NegotiateRequest,
+}
+
+
+def legacy_parse(raw: str):
+    req = json.loads(raw)
+    return LEGACY_SCHEMAS[RequestType(req.get('type'))](**req)
+
+
+def legacy_encode(model: BaseModel) -> str:
+    # What Starlette's WebSocket.send_json does with model_dump()
+    return json.dumps(model.model_dump(), separators=(',', ':'), ensure_ascii=False)
+
+
+def sample_requests() -> dict[str, dict]:
+    with open(fixture_path(5), 'rb') as f:
+        clip = base64.b64encode(f.read()).decode('utf-8')
+    return {
+        RequestType.CREATE_ROOM.value: {'player_name': 'Alice'},
+        RequestType.JOIN_ROOM.value: {'room_id': 'ABCD', 'player_name': 'Bob'},
+        RequestType.START_GAME.value: {},
+        RequestType.LEAVE_ROOM.value: {},
+        RequestType.UPLOAD_START.value: {'round_number': 2, 'size': 48_000},
+        RequestType.NEGOTIATE.value: {'audio_transport': 'url'},
+        RequestType.UPLOAD_FILE.value: {'round_number': 2, 'file_data': clip},
+    }
+
+
+def sample_notifications(players: int) -> dict[str, BaseModel]:
+    player_ids = [str(uuid4()) for _ in range(players)]
+    room = RoomModel(
+        code='ABCD',
+        player_ids=player_ids,
+        player_names={
+            player_id: f'Player {i}' for i, player_id in enumerate(player_ids)
+        },
+        host_id=player_ids[0],
+    )
+    url = sign_audio_url('ABCD_round1_player_reversed.webm')
+    waveform = [i * 7 % 256 for i in range(WAVEFORM_BUCKETS)]
+    return {
+        'room_updated': RoomUpdatedNotification(room=room),
+        'game_round': GameRoundNotification(
+            round_number=2,
+            audio=url,
+            audio_transport=AudioTransport.URL,
+            waveform=waveform,
+        ),
+        f'game_summary ({players}p)': GameSummaryNotification(
+            files=[[(player_id, url, url, waveform) for player_id in player_ids]]
+            * players,
+            audio_transport=AudioTransport.URL,
+        ),
+    }
+
+
+def rate(fn, arg, seconds: float) -> float:
+    fn(arg)
+    count = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            fn(arg)
+        count += 100
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--seconds', type=float, default=0.5, help='per case')
+    parser.add_argument('--players', type=int, default=8)
+    args = parser.parse_args()
+
+    print(f'{"message":<22} {"before msg/s":>13} {"after msg/s":>13} {"speedup":>8}')
+    for name, fields in sample_requests().items():
+        raw = json.dumps({'type': name, **fields})
+        before = rate(legacy_parse, raw, args.seconds)
+        after = rate(request_message_adapter.validate_json, raw, args.seconds)
+        print(f'{name:<22} {before:>13,.0f} {after:>13,.0f} {after / before:>7.2f}x')
+    for name, model in sample_notifications(args.players).items():
+        before = rate(legacy_encode, model, args.seconds)
+        after = rate(BaseModel.model_dump_json, model, args.seconds)
+        print(f'{name:<22} {before:>13,.0f} {after:>13,.0f} {after / before:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
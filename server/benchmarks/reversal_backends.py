@@ -0,0 +1,100 @@
+"""
+Compare reversal backends on the bundled webm fixtures.
+
+Every (backend, clip) pair runs in a fresh process so peak RSS is not polluted
+by earlier runs. CPU time includes child processes, which is where the pydub
+backend's ffmpeg work happens.
+
+    python -m benchmarks.reversal_backends --iterations 20
+"""
+
+import argparse
+import multiprocessing
+import resource
+import statistics
+import time
+
+from game_core.reverse_audio import BACKENDS, get_backend
+
+from .make_fixtures import CLIP_SECONDS, fixture_path
+
+
+def _cpu_seconds() -> float:
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def _run(backend_name: str, seconds: int, iterations: int, results) -> None:
+    with open(fixture_path(seconds), 'rb') as f:
+        file_bytes = f.read()
+    backend = get_backend(backend_name)
+    try:
+        # Warm up imports and codec initialisation outside the measured loop
+        backend.reverse(file_bytes, 'webm', 'webm')
+        latencies = []
+        cpu_start = _cpu_seconds()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            backend.reverse(file_bytes, 'webm', 'webm')
+            latencies.append(time.perf_counter() - start)
+        cpu = (_cpu_seconds() - cpu_start) / iterations
+    except Exception as e:
+        results.put({'error': f'{type(e).__name__}: {e}'})
+        return
+
+    # ru_maxrss is in KiB on Linux
+    peak_rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    results.put(
+        {
+            'p50': statistics.median(latencies),
+            'p95': sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+            'cpu': cpu,
+            'rss': peak_rss / 1024,
+        }
+    )
+
+
+def measure(backend_name: str, seconds: int, iterations: int) -> dict:
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(
+        target=_run, args=(backend_name, seconds, iterations, results)
+    )
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--backends', nargs='+', default=sorted(BACKENDS))
+    parser.add_argument('--clips', nargs='+', type=int, default=CLIP_SECONDS)
+    parser.add_argument('--iterations', type=int, default=10)
+    args = parser.parse_args()
+
+    print(
+        f'{"backend":<8} {"clip":>5} {"p50 ms":>9} {"p95 ms":>9} '
+        f'{"cpu ms":>9} {"peak MiB":>9}'
+    )
+    for backend_name in args.backends:
+        for seconds in args.clips:
+            result = measure(backend_name, seconds, args.iterations)
+            if 'error' in result:
+                print(f'{backend_name:<8} {seconds:>4}s  {result["error"]}')
+                continue
+            print(
+                f'{backend_name:<8} {seconds:>4}s '
+                f'{result["p50"] * 1000:>9.1f} {result["p95"] * 1000:>9.1f} '
+                f'{result["cpu"] * 1000:>9.1f} {result["rss"]:>9.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Hammer one room with concurrent joins, leaves and round advances and check
+that no update is lost. Needs a Redis server reachable through config.
+
+    python -m benchmarks.room_concurrency --players 200
+
+Exits non-zero if the final room state or event stream is inconsistent: every
+remaining player must be in the room exactly once, with the original host.
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+
+from game_core.redis_manager import RedisManager
+from models.events import RoomEvent
+from models.room import RoomModel
+
+
+async def run(players: int, leavers: int, timers: int) -> list[str]:
+    manager = RedisManager()
+    room = await manager.create_room('host', 'host')
+    channel = f'room:{room.code}:events'
+    failures = []
+
+    events: list[RoomEvent] = []
+    pubsub = manager.redis_client.pubsub()
+    await pubsub.subscribe(channel)
+
+    async def collect():
+        async for message in pubsub.listen():
+            if message['type'] == 'message':
+                events.append(RoomEvent.model_validate_json(message['data']))
+
+    collector = asyncio.create_task(collect())
+
+    player_ids = [f'player-{i}' for i in range(players)]
+    leaving = set(random.sample(player_ids, leavers))
+
+    async def join_then_maybe_leave(player_id: str):
+        await manager.add_player_to_room(room.code, player_id, player_id)
+        if player_id in leaving:
+            await manager.remove_player_from_room(room.code, player_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(join_then_maybe_leave(p) for p in player_ids))
+    elapsed = time.perf_counter() - start
+
+    final = await manager.get_room(room.code)
+    expected = {'host'} | (set(player_ids) - leaving)
+    failures.extend(check_room(final, expected))
+
+    # Competing round timers must only advance round 1 once
+    await manager.start_game(room.code)
+    await asyncio.gather(
+        *(manager.next_round(room.code, expected_round=1) for _ in range(timers))
+    )
+    game = await manager.get_game(room.code)
+    if game is None or game.round != 2:
+        failures.append(f'expected round 2 after racing timers, got {game}')
+
+    await asyncio.sleep(0.5)
+    collector.cancel()
+    await pubsub.aclose()
+    versions = [event.version for event in events]
+    if versions != sorted(set(versions)):
+        failures.append('event versions are not strictly increasing')
+
+    mutations = players + leavers + 2
+    print(
+        f'{mutations} mutations on room {room.code} in {elapsed:.2f}s '
+        f'({players / elapsed:.0f} joins/s), {len(events)} events'
+    )
+    await manager.end_game(room.code)
+    await manager.redis_client.delete(f'room:{room.code}')
+    return failures
+
+
+def check_room(room: RoomModel | None, expected: set[str]) -> list[str]:
+    """
+    Every expected player is in the room exactly once, nobody else is, and
+    the host is one of them.
+    """
+    if room is None:
+        return ['room is gone']
+    failures = []
+    counts = Counter(room.player_ids)
+    missing = expected - counts.keys()
+    if missing:
+        failures.append(f'room lost {len(missing)} players')
+    extra = counts.keys() - expected
+    if extra:
+        failures.append(f'room kept {len(extra)} players that left')
+    duplicated = [player_id for player_id, count in counts.items() if count > 1]
+    if duplicated:
+        failures.append(f'{len(duplicated)} players are in the room more than once')
+    if set(room.player_names) != counts.keys():
+        failures.append('player_names out of sync with player_ids')
+    if room.host_id != 'host' or room.host_id not in counts:
+        failures.append(f'expected the original host, got {room.host_id}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--leavers', type=int, default=50)
+    parser.add_argument('--timers', type=int, default=10)
+    args = parser.parse_args()
+
+    failures = asyncio.run(run(args.players, args.leavers, args.timers))
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
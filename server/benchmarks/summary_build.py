@@ -0,0 +1,106 @@
+"""
+Time how long reading a game summary's clips takes for 4-, 8- and 16-player
+rooms, with blocking sequential reads (the old FileManager behaviour) against
+LocalStorage's bounded concurrent reads.
+
+A summary holds an original and a reversed clip per player per round, so an
+N-player room reads 2·N² files. Alongside wall time, the benchmark reports the
+longest event loop stall, which is what other connections on the worker feel.
+
+    python -m benchmarks.summary_build --clip 5 --iterations 5
+"""
+
+import argparse
+import asyncio
+import shutil
+import statistics
+import tempfile
+import time
+
+from config import STORAGE_MAX_CONCURRENCY
+from game_core.storage import LocalStorage
+
+from .make_fixtures import fixture_path
+
+
+async def _max_loop_stall(done: asyncio.Event, interval: float = 0.001) -> float:
+    worst = 0.0
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def _sequential(storage: LocalStorage, file_keys: list[str]) -> None:
+    for file_key in file_keys:
+        with open(storage.path(file_key), 'rb') as f:
+            f.read()
+
+
+async def _concurrent(storage: LocalStorage, file_keys: list[str]) -> None:
+    await storage.read_many(file_keys)
+
+
+async def measure(strategy, storage, file_keys, iterations: int) -> tuple[float, float]:
+    durations, stalls = [], []
+    for _ in range(iterations):
+        done = asyncio.Event()
+        monitor = asyncio.create_task(_max_loop_stall(done))
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        await strategy(storage, file_keys)
+        durations.append(time.perf_counter() - start)
+        done.set()
+        stalls.append(await monitor)
+    return statistics.median(durations), max(stalls)
+
+
+async def run(players: list[int], clip: int, iterations: int, concurrency: int):
+    with open(fixture_path(clip), 'rb') as f:
+        clip_bytes = f.read()
+    root = tempfile.mkdtemp(prefix='summary_build_')
+    try:
+        storage = LocalStorage(root, max_concurrency=concurrency)
+        print(
+            f'{"players":>7} {"files":>6} {"strategy":<11} '
+            f'{"p50 ms":>9} {"max stall ms":>13}'
+        )
+        for n in players:
+            file_keys = [
+                f'room_round{r}_player{p}{suffix}.webm'
+                for r in range(1, n + 1)
+                for p in range(n)
+                for suffix in ('', '_reversed')
+            ]
+            for file_key in file_keys:
+                await storage.write(file_key, clip_bytes)
+            for name, strategy in (
+                ('sequential', _sequential),
+                ('concurrent', _concurrent),
+            ):
+                p50, stall = await measure(strategy, storage, file_keys, iterations)
+                print(
+                    f'{n:>7} {len(file_keys):>6} {name:<11} '
+                    f'{p50 * 1000:>9.1f} {stall * 1000:>13.1f}'
+                )
+            for file_key in file_keys:
+                await storage.delete(file_key)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--players', nargs='+', type=int, default=[4, 8, 16])
+    parser.add_argument('--clip', type=int, default=5, help='fixture length (s)')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument(
+        '--concurrency', type=int, default=STORAGE_MAX_CONCURRENCY, help='read limit'
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.players, args.clip, args.iterations, args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
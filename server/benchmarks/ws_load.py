@@ -0,0 +1,355 @@
+"""
+Load-test the /game/ WebSocket protocol with many rooms of virtual players.
+
+Each room's host creates a room, the other players join, the host starts the
+game, and every player uploads a fixture clip as soon as each round begins,
+until the game summary arrives. Rounds then end as soon as everyone has
+uploaded, so the numbers measure the server rather than ROUND_DURATION.
+
+Reports p50/p95/p99 latency for:
+- join: join_room sent until room_joined received
+- round: the round's trigger (start_game, or the last upload of the previous
+  round) until each player receives game_round
+- summary: the last upload of the final round until each player receives
+  game_summary
+plus message and game throughput, and peak RSS of the server and the load
+generator. Needs Redis reachable through config. By default a uvicorn server
+is started for the run; pass --url to target one that is already running.
+
+    python -m benchmarks.ws_load --rooms 200 --players 4
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+
+import websockets
+
+from .make_fixtures import fixture_path
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class Stats:
+    latencies: dict[str, list[float]] = field(
+        default_factory=lambda: {'join': [], 'round': [], 'summary': []}
+    )
+    messages: int = 0
+    bytes_uploaded: int = 0
+    games: int = 0
+    # Messages with no upload to measure their latency from
+    skipped: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+@dataclass
+class RoomRun:
+    players: int
+    start_sent: float = 0.0
+    # Round number -> when the last player's upload for it was sent
+    last_upload: dict[int, float] = field(default_factory=dict)
+    # (round number or 0 for the summary, receive time) per player
+    received: list[tuple[int, float]] = field(default_factory=list)
+
+
+class VirtualPlayer:
+    def __init__(self, url: str, transport: str, clip: bytes, stats: Stats):
+        self.url = url
+        self.transport = transport
+        self.clip = clip
+        self.stats = stats
+        self.max_frame_size = 64 * 1024
+
+    async def connect(self, timeout: float):
+        self.timeout = timeout
+        self.ws = await websockets.connect(self.url, max_size=None)
+        await self.send({'type': 'negotiate', 'audio_transport': self.transport})
+        negotiated = await self.receive('protocol_negotiated')
+        self.max_frame_size = negotiated['max_frame_size']
+
+    async def send(self, message: dict):
+        await self.ws.send(json.dumps(message))
+
+    async def receive(self, *types: str) -> dict:
+        """
+        Wait for the next JSON message of one of `types`, skipping others and
+        any binary audio frames.
+        """
+        while True:
+            frame = await asyncio.wait_for(self.ws.recv(), self.timeout)
+            self.stats.messages += 1
+            if isinstance(frame, bytes):
+                continue
+            message = json.loads(frame)
+            if message['type'] == 'error':
+                raise RuntimeError(message['error'])
+            if message['type'] in types:
+                return message
+
+    async def upload(self, round_number: int):
+        if self.transport == 'base64':
+            await self.send(
+                {
+                    'type': 'upload_file',
+                    'round_number': round_number,
+                    'file_data': base64.b64encode(self.clip).decode('utf-8'),
+                }
+            )
+        else:
+            await self.send(
+                {
+                    'type': 'upload_start',
+                    'round_number': round_number,
+                    'size': len(self.clip),
+                }
+            )
+            for offset in range(0, len(self.clip), self.max_frame_size):
+                await self.ws.send(self.clip[offset : offset + self.max_frame_size])
+        self.stats.bytes_uploaded += len(self.clip)
+
+    async def play(self, room: RoomRun):
+        while True:
+            message = await self.receive('game_round', 'game_summary')
+            received_at = time.perf_counter()
+            if message['type'] == 'game_summary':
+                room.received.append((0, received_at))
+                return
+            round_number = message['round_number']
+            room.received.append((round_number, received_at))
+            await self.upload(round_number)
+            room.last_upload[round_number] = max(
+                room.last_upload.get(round_number, 0.0), time.perf_counter()
+            )
+
+    async def close(self):
+        await self.ws.close()
+
+
+async def run_room(args, clip: bytes, stats: Stats, setup: asyncio.Semaphore):
+    players = [
+        VirtualPlayer(args.url, args.transport, clip, stats)
+        for _ in range(args.players)
+    ]
+    room = RoomRun(players=args.players)
+    try:
+        async with setup:
+            host = players[0]
+            await host.connect(args.timeout)
+            await host.send({'type': 'create_room', 'player_name': 'host'})
+            room_code = (await host.receive('room_created'))['room']['code']
+            for i, player in enumerate(players[1:], start=1):
+                await player.connect(args.timeout)
+                start = time.perf_counter()
+                await player.send(
+                    {
+                        'type': 'join_room',
+                        'room_id': room_code,
+                        'player_name': f'player {i}',
+                    }
+                )
+                await player.receive('room_joined')
+                stats.latencies['join'].append(time.perf_counter() - start)
+            # The host's view of the room must include everyone before the
+            # server accepts start_game
+            joined = 1
+            while joined < len(players):
+                update = await host.receive('room_updated')
+                joined = len(update['room']['player_ids'])
+
+        room.start_sent = time.perf_counter()
+        await host.send({'type': 'start_game'})
+        await asyncio.gather(*(player.play(room) for player in players))
+        record_latencies(room, stats)
+    except Exception as e:
+        stats.errors.append(f'{type(e).__name__}: {e}')
+        return
+    finally:
+        await asyncio.gather(
+            *(player.close() for player in players if hasattr(player, 'ws')),
+            return_exceptions=True,
+        )
+    stats.games += 1
+
+
+def record_latencies(room: RoomRun, stats: Stats):
+    """
+    Add a finished room's round and summary latencies to `stats`. A round
+    that ended on the timer without any upload has no trigger to measure
+    from, so the messages that follow it are counted as skipped.
+    """
+    final_round = max(round_number for round_number, _ in room.received)
+    for round_number, received_at in room.received:
+        if round_number == 1:
+            trigger = room.start_sent
+        else:
+            previous = final_round if round_number == 0 else round_number - 1
+            trigger = room.last_upload.get(previous)
+        if trigger is None:
+            stats.skipped += 1
+            continue
+        name = 'summary' if round_number == 0 else 'round'
+        stats.latencies[name].append(received_at - trigger)
+
+
+def _rss_bytes(pid: int) -> int:
+    """
+    Resident memory of `pid` and its direct children (uvicorn workers).
+    """
+    pids = [pid]
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    total = 0
+    for child in pids:
+        try:
+            with open(f'/proc/{child}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return total
+
+
+async def sample_rss(pid: int, peak: list[int], interval: float = 0.5):
+    while True:
+        peak[0] = max(peak[0], _rss_bytes(pid))
+        await asyncio.sleep(interval)
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    process = subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            '-m',
+            'uvicorn',
+            'app.main:app',
+            '--port',
+            str(port),
+            '--workers',
+            str(workers),
+            '--log-level',
+            'warning',
+        ],
+        cwd=SERVER_DIR,
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('Server did not start')
+
+
+def percentiles(values: list[float]) -> tuple[float, float, float]:
+    if len(values) < 2:
+        value = values[0] if values else float('nan')
+        return value, value, value
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return cuts[49], cuts[94], cuts[98]
+
+
+async def run(args) -> Stats:
+    with open(fixture_path(args.clip), 'rb') as f:
+        clip = f.read()
+    stats = Stats()
+    setup = asyncio.Semaphore(args.setup_concurrency)
+
+    server_peak = [0]
+    sampler = None
+    if args.server_pid:
+        sampler = asyncio.create_task(sample_rss(args.server_pid, server_peak))
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(run_room(args, clip, stats, setup) for _ in range(args.rooms))
+    )
+    elapsed = time.perf_counter() - start
+    if sampler is not None:
+        sampler.cancel()
+
+    print(
+        f'{args.rooms} rooms x {args.players} players, {args.transport} transport, '
+        f'{args.clip}s clips: {stats.games} games in {elapsed:.1f}s, '
+        f'{len(stats.errors)} failed'
+    )
+    if stats.skipped:
+        print(
+            f'{stats.skipped} messages not timed: their previous round had no uploads'
+        )
+    print(f'{"latency":<8} {"count":>6} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+    for name, values in stats.latencies.items():
+        p50, p95, p99 = percentiles(values)
+        print(
+            f'{name:<8} {len(values):>6} {p50 * 1000:>9.1f} '
+            f'{p95 * 1000:>9.1f} {p99 * 1000:>9.1f}'
+        )
+    print(
+        f'throughput: {stats.messages / elapsed:,.0f} msg/s received, '
+        f'{stats.games / elapsed:.2f} games/s, '
+        f'{stats.bytes_uploaded / elapsed / 2**20:.1f} MiB/s uploaded'
+    )
+    # ru_maxrss is in KiB on Linux
+    client_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    server_rss = f'{server_peak[0] / 2**20:.0f} MiB' if args.server_pid else 'n/a'
+    print(f'peak RSS: server {server_rss}, load generator {client_rss:.0f} MiB')
+    for error in sorted(set(stats.errors))[:10]:
+        print(f'error: {error}')
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rooms', type=int, default=100)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--clip', type=int, default=1, help='fixture length (s)')
+    parser.add_argument(
+        '--transport', choices=['url', 'binary', 'base64'], default='url'
+    )
+    parser.add_argument('--url', help='ws:// URL of a running /game/ endpoint')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument(
+        '--server-pid', type=int, help='sample this process when using --url'
+    )
+    parser.add_argument('--setup-concurrency', type=int, default=50)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    server = None
+    if args.url is None:
+        server = start_server(args.port, args.workers)
+        args.url = f'ws://127.0.0.1:{args.port}/game/'
+        args.server_pid = server.pid
+    try:
+        stats = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    sys.exit(1 if stats.errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
 from .redis_client import get_redis_client
+from .s3_client import close_s3_client, get_s3_client
 
-__all__ = ['get_redis_client']
+__all__ = ['close_s3_client', 'get_redis_client', 'get_s3_client']
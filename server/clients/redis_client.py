@@ -1,13 +1,24 @@
 import redis.asyncio as aioredis
 
-from config import REDIS_HOST, REDIS_PASSWORD, REDIS_PORT
+from config import (
+    REDIS_HOST,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_PASSWORD,
+    REDIS_POOL_TIMEOUT,
+    REDIS_PORT,
+)
 
-redis_client = aioredis.Redis(
+# Blocks callers while every connection is in use, where the default pool would
+# raise MaxConnectionsError and drop whatever they were doing
+redis_pool = aioredis.BlockingConnectionPool(
     host=REDIS_HOST,
     port=REDIS_PORT,
     password=REDIS_PASSWORD,
     decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
 )
+redis_client = aioredis.Redis(connection_pool=redis_pool)
 
 
 def get_redis_client() -> aioredis.Redis:
@@ -0,0 +1,48 @@
+import asyncio
+from contextlib import AsyncExitStack
+
+from aiobotocore.client import AioBaseClient
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+
+from config import (
+    S3_ACCESS_KEY_ID,
+    S3_ENDPOINT_URL,
+    S3_MAX_CONNECTIONS,
+    S3_REGION,
+    S3_SECRET_ACCESS_KEY,
+)
+
+_exit_stack = AsyncExitStack()
+_client_lock = asyncio.Lock()
+s3_client: AioBaseClient | None = None
+
+
+async def get_s3_client() -> AioBaseClient:
+    """
+    Shared S3 client. It is created on first use and keeps one connection pool
+    of S3_MAX_CONNECTIONS for the whole worker.
+    """
+    global s3_client
+    if s3_client is not None:
+        return s3_client
+    async with _client_lock:
+        if s3_client is None:
+            s3_client = await _exit_stack.enter_async_context(
+                get_session().create_client(
+                    's3',
+                    endpoint_url=S3_ENDPOINT_URL,
+                    region_name=S3_REGION,
+                    aws_access_key_id=S3_ACCESS_KEY_ID,
+                    aws_secret_access_key=S3_SECRET_ACCESS_KEY,
+                    config=AioConfig(max_pool_connections=S3_MAX_CONNECTIONS),
+                )
+            )
+    return s3_client
+
+
+async def close_s3_client() -> None:
+    global s3_client
+    async with _client_lock:
+        await _exit_stack.aclose()
+        s3_client = None
@@ -1,4 +1,5 @@
 import os
+import secrets
 
 from dotenv import load_dotenv
 
@@ -8,6 +9,56 @@ load_dotenv(dotenv_path)
 
 MODE = os.getenv('MODE')
 
+# Where uploaded and reversed clips are written: 'local' keeps them under
+# STORAGE_PATH, 's3' puts them in S3_BUCKET so any worker can serve any game.
+# STORAGE_PATH is still used for local caches either way.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')
+STORAGE_PATH = os.getenv(
+    'STORAGE_PATH', os.path.join(os.path.dirname(__file__), '..', 'game_files')
+)
+# How many local files are read at once when a summary is assembled
+STORAGE_MAX_CONCURRENCY = int(os.getenv('STORAGE_MAX_CONCURRENCY', 16))
+
+# Uploads are rejected once the storage disk has less than this many bytes free
+STORAGE_MIN_FREE_BYTES = int(os.getenv('STORAGE_MIN_FREE_BYTES', 512 * 1024 * 1024))
+
+# Room codes come from a Redis pool of every ROOM_CODE_LENGTH-letter code. When
+# fewer than ROOM_CODE_POOL_LOW_WATER are free, rooms get random codes of
+# ROOM_CODE_FALLBACK_LENGTH letters instead. Codes of deleted or expired rooms
+# are returned to the pool every ROOM_CODE_RECLAIM_INTERVAL seconds, once the
+# room's keys have all expired (up to ROOM_TTL after its last activity).
+ROOM_CODE_LENGTH = int(os.getenv('ROOM_CODE_LENGTH', 4))
+ROOM_CODE_FALLBACK_LENGTH = int(os.getenv('ROOM_CODE_FALLBACK_LENGTH', 6))
+ROOM_CODE_POOL_LOW_WATER = int(os.getenv('ROOM_CODE_POOL_LOW_WATER', 1000))
+ROOM_CODE_RECLAIM_INTERVAL = int(os.getenv('ROOM_CODE_RECLAIM_INTERVAL', 60))
+
+# A dropped player can resume their session for this long before they are
+# removed from their room
+SESSION_GRACE_PERIOD = int(os.getenv('SESSION_GRACE_PERIOD', 60))  # seconds
+
+# Rooms, games and round indexes expire after ROOM_TTL seconds without activity.
+# The audio sweeper then deletes clips whose room no longer exists, at most
+# AUDIO_SWEEP_RATE files per second, skipping files younger than the grace period.
+ROOM_TTL = int(os.getenv('ROOM_TTL', 6 * 60 * 60))
+AUDIO_SWEEP_INTERVAL = int(os.getenv('AUDIO_SWEEP_INTERVAL', 10 * 60))  # seconds
+AUDIO_SWEEP_GRACE = int(os.getenv('AUDIO_SWEEP_GRACE', 10 * 60))  # seconds
+AUDIO_SWEEP_BATCH = int(os.getenv('AUDIO_SWEEP_BATCH', 200))
+AUDIO_SWEEP_RATE = float(os.getenv('AUDIO_SWEEP_RATE', 100))
+
+# S3-compatible object storage. Set S3_ENDPOINT_URL to use MinIO or another
+# S3-compatible service instead of AWS.
+S3_BUCKET = os.getenv('S3_BUCKET', 'retronome-audio')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
+S3_REGION = os.getenv('S3_REGION', 'us-east-1')
+S3_ACCESS_KEY_ID = os.getenv('S3_ACCESS_KEY_ID')
+S3_SECRET_ACCESS_KEY = os.getenv('S3_SECRET_ACCESS_KEY')
+# Size of the client's connection pool, which also bounds concurrent requests
+S3_MAX_CONNECTIONS = int(os.getenv('S3_MAX_CONNECTIONS', 32))
+# Objects larger than the threshold are uploaded in parts of S3_MULTIPART_PART_SIZE
+# (S3 requires parts of at least 5 MiB)
+S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024))
+S3_MULTIPART_PART_SIZE = int(os.getenv('S3_MULTIPART_PART_SIZE', 8 * 1024 * 1024))
+
 if MODE == 'production':
     REDIS_HOST = os.getenv('REDIS_HOST')
     REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
@@ -16,3 +67,83 @@ else:
     REDIS_HOST = 'localhost'
     REDIS_PORT = 6379
     REDIS_PASSWORD = None
+
+# Each worker shares one pool of REDIS_MAX_CONNECTIONS connections to Redis. When
+# they are all busy, a command waits up to REDIS_POOL_TIMEOUT seconds for one to
+# be released instead of failing straight away.
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 100))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', 10))
+
+# Key for signing audio URLs. Production refuses to start without one. Elsewhere
+# an unset secret falls back to a random one per process, so URLs only verify
+# on the worker that signed them; set it to run several workers in development.
+AUDIO_URL_SECRET = os.getenv('AUDIO_URL_SECRET')
+if not AUDIO_URL_SECRET:
+    if MODE == 'production':
+        raise RuntimeError('AUDIO_URL_SECRET must be set in production')
+    AUDIO_URL_SECRET = secrets.token_hex(32)
+
+# Signed audio URLs are valid for at least AUDIO_URL_TTL seconds. Expiry is
+# rounded up to AUDIO_URL_TTL_BUCKET so URLs for the same clip stay identical
+# (and browser-cacheable) between the round view and the results view.
+AUDIO_URL_TTL = int(os.getenv('AUDIO_URL_TTL', 30 * 60))
+AUDIO_URL_TTL_BUCKET = int(os.getenv('AUDIO_URL_TTL_BUCKET', 10 * 60))
+
+# Audio reversal runs in a bounded process pool so ffmpeg work never blocks the
+# event loop. REVERSAL_MAX_PENDING caps queued + running jobs per worker.
+REVERSAL_WORKERS = int(os.getenv('REVERSAL_WORKERS', os.cpu_count() or 1))
+REVERSAL_MAX_PENDING = int(os.getenv('REVERSAL_MAX_PENDING', 32))
+REVERSAL_TIMEOUT = float(os.getenv('REVERSAL_TIMEOUT', 15))  # seconds
+
+# Which game_core.reverse_audio backend to use: 'pydub' (ffmpeg subprocesses) or
+# 'pyav' (in-process decode/encode). Compare them with the reversal benchmark.
+REVERSAL_BACKEND = os.getenv('REVERSAL_BACKEND', 'pydub')
+
+# Reversed clips are cached by content hash. The memory tier is an LRU bounded by
+# total bytes; the disk tier (under STORAGE_PATH) is optional and evicts its least
+# recently used files once they exceed REVERSAL_CACHE_DISK_MAX_BYTES.
+REVERSAL_CACHE_MAX_BYTES = int(os.getenv('REVERSAL_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+REVERSAL_CACHE_DISK = os.getenv('REVERSAL_CACHE_DISK', 'false').lower() == 'true'
+REVERSAL_CACHE_DISK_MAX_BYTES = int(
+    os.getenv('REVERSAL_CACHE_DISK_MAX_BYTES', 1024 * 1024 * 1024)
+)
+
+# Largest accepted audio upload, and the largest binary WebSocket frame used
+# when a client negotiates the binary audio transport
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 5 * 1024 * 1024))
+WS_MAX_FRAME_BYTES = int(os.getenv('WS_MAX_FRAME_BYTES', 64 * 1024))
+
+# Each connection's outbound messages wait in a queue written by its own task.
+# A client is a slow consumer once a message has waited WS_QUEUE_MAX_DELAY
+# seconds, or more than WS_QUEUE_MAX_MESSAGES messages or WS_QUEUE_MAX_BYTES
+# bytes pile up: 'disconnect' closes its socket (it can then resume its
+# session), 'degrade' first switches it to URL audio and only disconnects it if
+# it falls behind again.
+WS_QUEUE_MAX_DELAY = float(os.getenv('WS_QUEUE_MAX_DELAY', 10))  # seconds
+WS_QUEUE_MAX_MESSAGES = int(os.getenv('WS_QUEUE_MAX_MESSAGES', 1024))
+WS_QUEUE_MAX_BYTES = int(os.getenv('WS_QUEUE_MAX_BYTES', 32 * 1024 * 1024))
+WS_SLOW_CONSUMER_POLICY = os.getenv('WS_SLOW_CONSUMER_POLICY', 'degrade')
+
+ROUND_DURATION = int(os.getenv('ROUND_DURATION', 30))  # seconds
+
+# Uploads get a waveform of this many peaks (one byte each), sent with their
+# clips so clients can draw them before downloading any audio
+WAVEFORM_BUCKETS = int(os.getenv('WAVEFORM_BUCKETS', 64))
+
+# Serve Prometheus metrics at /metrics. When disabled, hot paths skip recording
+# them. With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to a directory
+# that is emptied before each start; every worker writes its samples there and
+# /metrics reports their aggregate, whichever worker answers.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+# Log level for the server's own loggers. Per-message logs (round updates,
+# uploads) are at DEBUG and only LOG_SAMPLE_RATE of them are written.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 0.01))
+
+# How uploads are re-encoded before they are stored, see
+# game_core.reverse_audio.PROFILES: 'original' keeps the upload as recorded,
+# 'voice' is mono 24 kbps Opus and 'compact' mono 12 kbps. The clip and its
+# reversal come from the same decode.
+AUDIO_PROFILE = os.getenv('AUDIO_PROFILE', 'voice')
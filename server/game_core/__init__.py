@@ -1,4 +1,50 @@
+from .audio_sweeper import get_audio_sweeper
+from .audio_urls import sign_audio_url, verify_audio_signature
+from .file_manager import FileManager
 from .game_controller import GameController
+from .logs import configure_logging
+from .metrics import close_metrics
+from .metrics import render as render_metrics
+from .pubsub_hub import get_pubsub_hub
+from .reversal_cache import get_reversal_cache
+from .reversal_engine import (
+    ReversalError,
+    ReversalTimeoutError,
+    get_reversal_engine,
+)
 from .reverse_audio import reverse_audio
+from .room_codes import get_room_code_pool
+from .round_scheduler import get_round_scheduler
+from .session_manager import get_session_manager
+from .storage import (
+    LocalStorage,
+    S3Storage,
+    Storage,
+    StorageFullError,
+    get_storage,
+)
 
-__all__ = ['GameController', 'reverse_audio']
+__all__ = [
+    'FileManager',
+    'GameController',
+    'LocalStorage',
+    'ReversalError',
+    'ReversalTimeoutError',
+    'S3Storage',
+    'Storage',
+    'StorageFullError',
+    'close_metrics',
+    'configure_logging',
+    'get_audio_sweeper',
+    'get_pubsub_hub',
+    'get_reversal_cache',
+    'get_reversal_engine',
+    'get_room_code_pool',
+    'get_round_scheduler',
+    'get_session_manager',
+    'get_storage',
+    'render_metrics',
+    'reverse_audio',
+    'sign_audio_url',
+    'verify_audio_signature',
+]
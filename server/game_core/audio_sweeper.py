@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import re
+import time
+
+from clients.redis_client import get_redis_client
+from config import (
+    AUDIO_SWEEP_BATCH,
+    AUDIO_SWEEP_GRACE,
+    AUDIO_SWEEP_INTERVAL,
+    AUDIO_SWEEP_RATE,
+)
+
+from .storage import Storage, StoredFile, get_storage
+
+logger = logging.getLogger(__name__)
+
+# Round clips are named '{room_code}_round{n}_{player_id}[_reversed].webm'
+ROUND_FILE_PATTERN = re.compile(r'^([A-Za-z0-9]+)_round\d+_')
+
+SWEEP_LOCK_KEY = 'audio_sweeper:lock'
+
+
+class AudioSweeper:
+    """
+    Periodically deletes round clips whose room no longer exists in Redis,
+    i.e. rooms that were emptied or expired after ROOM_TTL.
+
+    Files are checked in batches with one pipelined EXISTS per batch, and
+    deletions are paced to AUDIO_SWEEP_RATE files per second so a large
+    backlog does not saturate the disk or bucket. Only one worker sweeps per
+    interval.
+    """
+
+    def __init__(
+        self,
+        storage: Storage | None = None,
+        interval: float = AUDIO_SWEEP_INTERVAL,
+        grace: float = AUDIO_SWEEP_GRACE,
+        batch_size: int = AUDIO_SWEEP_BATCH,
+        rate: float = AUDIO_SWEEP_RATE,
+    ):
+        self.storage = storage or get_storage()
+        self.redis_client = get_redis_client()
+        self.interval = interval
+        self.grace = grace
+        self.batch_size = batch_size
+        self.rate = rate
+        self._task: asyncio.Task | None = None
+        self._sweeps = 0
+        self._files_deleted = 0
+        self._bytes_reclaimed = 0
+        self._last_sweep_at: float | None = None
+        self._last_sweep_seconds: float | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # The lock outlives the sweep, so other workers skip this interval
+                if await self.redis_client.set(
+                    SWEEP_LOCK_KEY, 1, nx=True, ex=max(1, int(self.interval))
+                ):
+                    await self.sweep()
+            except Exception:
+                logger.exception('Audio sweep failed')
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> tuple[int, int]:
+        """
+        Delete orphaned clips. Returns the number of files and bytes removed.
+        """
+        start = time.monotonic()
+        cutoff = time.time() - self.grace
+        files_deleted = bytes_reclaimed = 0
+        batch: list[tuple[str, StoredFile]] = []
+        async for stored_file in self.storage.list_files():
+            match = ROUND_FILE_PATTERN.match(stored_file.file_key)
+            if match is None or stored_file.modified > cutoff:
+                continue
+            batch.append((match.group(1), stored_file))
+            if len(batch) >= self.batch_size:
+                files, size = await self._sweep_batch(batch)
+                files_deleted += files
+                bytes_reclaimed += size
+                batch = []
+        if batch:
+            files, size = await self._sweep_batch(batch)
+            files_deleted += files
+            bytes_reclaimed += size
+
+        self._sweeps += 1
+        self._last_sweep_at = time.time()
+        self._last_sweep_seconds = time.monotonic() - start
+        return files_deleted, bytes_reclaimed
+
+    async def _sweep_batch(
+        self, batch: list[tuple[str, StoredFile]]
+    ) -> tuple[int, int]:
+        room_codes = list({room_code for room_code, _ in batch})
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for room_code in room_codes:
+                pipe.exists(f'room:{room_code}')
+            live = dict(zip(room_codes, await pipe.execute(), strict=True))
+
+        orphans = [
+            stored_file for room_code, stored_file in batch if not live[room_code]
+        ]
+        if not orphans:
+            return 0, 0
+        await self.storage.delete_many(
+            [stored_file.file_key for stored_file in orphans]
+        )
+        size = sum(stored_file.size for stored_file in orphans)
+        self._files_deleted += len(orphans)
+        self._bytes_reclaimed += size
+        await asyncio.sleep(len(orphans) / self.rate)
+        return len(orphans), size
+
+    def stats(self) -> dict:
+        return {
+            'sweeps': self._sweeps,
+            'files_deleted': self._files_deleted,
+            'bytes_reclaimed': self._bytes_reclaimed,
+            'last_sweep_at': self._last_sweep_at,
+            'last_sweep_seconds': self._last_sweep_seconds,
+        }
+
+
+audio_sweeper = AudioSweeper()
+
+
+def get_audio_sweeper() -> AudioSweeper:
+    return audio_sweeper
@@ -0,0 +1,30 @@
+import hashlib
+import hmac
+import math
+import time
+from urllib.parse import urlencode
+
+from config import AUDIO_URL_SECRET, AUDIO_URL_TTL, AUDIO_URL_TTL_BUCKET
+from models.types import FileKey, FileUrl
+
+
+def _signature(file_key: FileKey, expires: int) -> str:
+    message = f'{file_key}:{expires}'.encode()
+    return hmac.new(AUDIO_URL_SECRET.encode(), message, hashlib.sha256).hexdigest()
+
+
+def sign_audio_url(file_key: FileKey, ttl: int = AUDIO_URL_TTL) -> FileUrl:
+    """
+    Relative URL for GET /audio/{file_key} that is valid for at least `ttl`
+    seconds.
+    """
+    expires = math.ceil((time.time() + ttl) / AUDIO_URL_TTL_BUCKET)
+    expires *= AUDIO_URL_TTL_BUCKET
+    query = urlencode({'expires': expires, 'signature': _signature(file_key, expires)})
+    return f'/audio/{file_key}?{query}'
+
+
+def verify_audio_signature(file_key: FileKey, expires: int, signature: str) -> bool:
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(file_key, expires))
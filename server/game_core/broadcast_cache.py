@@ -0,0 +1,75 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+
+BROADCAST_CACHE_SIZE = 64
+BROADCAST_CACHE_TTL = 10.0  # seconds
+
+
+class BroadcastCache:
+    """
+    Encoded notification frames shared by every connection on this worker.
+
+    All local connections in a room receive the same event at the same time,
+    so the first one to ask for a (room, version, variant) frame builds it and
+    the rest await and reuse that result instead of serializing their own.
+    Frames are kept only briefly: they are needed for the fan-out, not after.
+    """
+
+    def __init__(
+        self, max_entries: int = BROADCAST_CACHE_SIZE, ttl: float = BROADCAST_CACHE_TTL
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, asyncio.Future[str]]] = (
+            OrderedDict()
+        )
+        self._hits = 0
+        self._misses = 0
+
+    async def get(self, key: Hashable, build: Callable[[], Awaitable[str]]) -> str:
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._hits += 1
+            return await asyncio.shield(entry[1])
+
+        self._misses += 1
+        future = asyncio.ensure_future(build())
+        self._entries[key] = (now + self.ttl, future)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        future.add_done_callback(lambda f: self._on_built(key, f))
+        return await asyncio.shield(future)
+
+    def _on_built(self, key: Hashable, future: asyncio.Future[str]) -> None:
+        # Don't keep failures around for the next connection to inherit
+        if not future.cancelled() and future.exception() is None:
+            return
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is future:
+            del self._entries[key]
+
+    def _expire(self, now: float) -> None:
+        # Entries are inserted in expiry order
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'entries': len(self._entries),
+        }
+
+
+broadcast_cache = BroadcastCache()
+
+
+def get_broadcast_cache() -> BroadcastCache:
+    return broadcast_cache
@@ -1,95 +1,222 @@
-import base64
+import asyncio
 import json
-import os
 from collections.abc import Awaitable
-from typing import Optional
+from typing import NamedTuple, Optional
 
 from clients.redis_client import get_redis_client
+from config import METRICS_ENABLED, ROOM_TTL, STORAGE_MIN_FREE_BYTES
 from models.room import RoomModel
-from models.types import B64Data, PlayerId
+from models.types import FileKey, GameFiles, Waveform
 
-from .reverse_audio import reverse_audio
+from .metrics import ENCODED_BYTES
+from .reversal_cache import get_reversal_cache
+from .reverse_audio import EncodingProfile, get_profile
+from .storage import Storage, StorageFullError, get_storage
 
 
-class FileManager:
-    def __init__(self):
-        self.storage_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)), '..', 'game_files'
-        )
-        if not os.path.exists(self.storage_path):
-            os.makedirs(self.storage_path)
-
-        self.redis_client = get_redis_client()
-
-    async def get_round_file(
-        self, room_code: str, round_number: int, player_id: str
-    ) -> Optional[B64Data]:
-        file_info = self.redis_client.hget(
-            f'game:{room_code}:round:{round_number}', player_id
-        )
+class RoundFile(NamedTuple):
+    """
+    One player's upload in a round, as indexed in Redis.
+    """
 
-        if isinstance(file_info, Awaitable):
-            file_info = await file_info
+    original: FileKey
+    reversed: FileKey
+    # Peaks of the original clip; None for clips stored before waveforms
+    waveform: Waveform | None = None
 
-        if not file_info:
-            return None
+    @property
+    def reversed_waveform(self) -> Waveform | None:
+        return self.waveform[::-1] if self.waveform is not None else None
 
-        file_paths = json.loads(file_info)
+    @classmethod
+    def from_json(cls, file_info: str) -> 'RoundFile':
+        info = json.loads(file_info)
+        return cls(info['original'], info['reversed'], info.get('waveform'))
 
-        reversed_file = file_paths['reversed']
+    def to_json(self) -> str:
+        return json.dumps(self._asdict())
 
-        with open(reversed_file, 'rb') as f:
-            file_data = f.read()
-            return base64.b64encode(file_data).decode('utf-8')
 
-    async def save_round_file(
-        self, room_code: str, round_number: int, player_id: str, base64_data: B64Data
-    ) -> None:
-        file_data = base64.b64decode(base64_data)
-        file_path = os.path.join(
-            self.storage_path, f'{room_code}_round{round_number}_{player_id}'
-        )
+# In-flight round lookups, shared by every FileManager on this worker
+round_lookups: dict[tuple[str, int], asyncio.Future[dict[str, RoundFile]]] = {}
+# Uploaded and stored bytes of each profile's clips on this worker
+encoding_totals: dict[str, list[int]] = {}
 
-        reversed_file_path = file_path + '_reversed'
 
-        with open(file_path + '.webm', 'wb') as f:
-            f.write(file_data)
+class FileManager:
+    storage: Storage
+    profile: EncodingProfile
 
-        with open(reversed_file_path + '.webm', 'wb') as f:
-            f.write(reverse_audio(file_data))
+    def __init__(self, profile: EncodingProfile | None = None):
+        self.storage = get_storage()
+        self.redis_client = get_redis_client()
+        self.reversal_cache = get_reversal_cache()
+        self.profile = profile or get_profile()
+        self._round_lookups = round_lookups
+        self._encoding_totals = encoding_totals
+
+    async def read_file(self, file_key: FileKey) -> bytes:
+        return await self.storage.read(file_key)
+
+    async def read_files(self, file_keys: list[FileKey]) -> dict[FileKey, bytes]:
+        """
+        Read several files concurrently (bounded by the storage backend).
+        """
+        unique_keys = list(dict.fromkeys(file_keys))
+        contents = await self.storage.read_many(unique_keys)
+        return dict(zip(unique_keys, contents, strict=True))
+
+    @staticmethod
+    def round_key(room_code: str, round_number: int) -> str:
+        return f'game:{room_code}:round:{round_number}'
+
+    async def get_round_files(
+        self, room_code: str, round_number: int
+    ) -> dict[str, RoundFile]:
+        """
+        The clips uploaded in `round_number`, by player id.
+
+        Every connection in a room asks for the same round at the same time,
+        so concurrent lookups on this worker share one HGETALL.
+        """
+        lookup_key = (room_code, round_number)
+        in_flight = self._round_lookups.get(lookup_key)
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(
+                self._fetch_round_files(room_code, round_number)
+            )
+            self._round_lookups[lookup_key] = in_flight
+            in_flight.add_done_callback(
+                lambda _: self._round_lookups.pop(lookup_key, None)
+            )
+        return await asyncio.shield(in_flight)
+
+    async def _fetch_round_files(
+        self, room_code: str, round_number: int
+    ) -> dict[str, RoundFile]:
+        content = self.redis_client.hgetall(self.round_key(room_code, round_number))
+        if isinstance(content, Awaitable):
+            content = await content
+        return {
+            player_id: RoundFile.from_json(file_info)
+            for player_id, file_info in content.items()
+        }
 
-        file_info = json.dumps(
-            {'original': file_path + '.webm', 'reversed': reversed_file_path + '.webm'}
-        )
+    async def get_round_file(
+        self, room_code: str, round_number: int, player_id: str
+    ) -> Optional[RoundFile]:
+        """
+        The clip `player_id` uploaded in `round_number`.
+        """
+        round_files = await self.get_round_files(room_code, round_number)
+        return round_files.get(player_id)
 
-        result = self.redis_client.hset(
-            f'game:{room_code}:round:{round_number}', player_id, file_info
+    async def save_round_file(
+        self, room_code: str, round_number: int, player_id: str, file_data: bytes
+    ) -> RoundFile:
+        """
+        Store an upload and its reversal, and index them with the upload's
+        waveform.
+        """
+        file_key = f'{room_code}_round{round_number}_{player_id}'
+        original_key = file_key + '.webm'
+        reversed_key = file_key + '_reversed.webm'
+
+        # Both clips are about the size of the upload
+        free_bytes = await self.storage.free_bytes()
+        if (
+            free_bytes is not None
+            and free_bytes - 2 * len(file_data) < STORAGE_MIN_FREE_BYTES
+        ):
+            raise StorageFullError(f'Only {free_bytes} bytes free in storage')
+
+        if self.profile.keep_original:
+
+            async def save_reversed() -> bytes:
+                _, reversed_data, peaks = await self.reversal_cache.transcode(
+                    file_data, self.profile
+                )
+                await self.storage.write(reversed_key, reversed_data)
+                return peaks
+
+            # The original is written while the reversal runs
+            _, peaks = await asyncio.gather(
+                self.storage.write(original_key, file_data), save_reversed()
+            )
+            stored_size = len(file_data)
+        else:
+            original_data, reversed_data, peaks = await self.reversal_cache.transcode(
+                file_data, self.profile
+            )
+            await asyncio.gather(
+                self.storage.write(original_key, original_data),
+                self.storage.write(reversed_key, reversed_data),
+            )
+            stored_size = len(original_data)
+        self._record_encoding(len(file_data), stored_size)
+
+        round_file = RoundFile(original_key, reversed_key, list(peaks))
+
+        round_key = self.round_key(room_code, round_number)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(round_key, player_id, round_file.to_json())
+            pipe.expire(round_key, ROOM_TTL)
+            await pipe.execute()
+        return round_file
+
+    def _record_encoding(self, upload_size: int, stored_size: int) -> None:
+        totals = self._encoding_totals.setdefault(self.profile.name, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += upload_size
+        totals[2] += stored_size
+        if METRICS_ENABLED:
+            ENCODED_BYTES.labels(self.profile.name, 'upload').inc(upload_size)
+            ENCODED_BYTES.labels(self.profile.name, 'stored').inc(stored_size)
+
+    @staticmethod
+    def encoding_stats() -> dict[str, dict]:
+        """
+        Per profile, how much smaller stored clips are than their uploads.
+        """
+        return {
+            name: {
+                'clips': clips,
+                'upload_bytes': upload_bytes,
+                'stored_bytes': stored_bytes,
+                'savings': 1 - stored_bytes / upload_bytes if upload_bytes else 0.0,
+            }
+            for name, (clips, upload_bytes, stored_bytes) in encoding_totals.items()
+        }
+
+    async def count_round_files(
+        self, room_code: str, round_number: int, player_ids: list[str]
+    ) -> int:
+        """
+        How many of `player_ids` have uploaded in `round_number`.
+        """
+        file_infos = self.redis_client.hmget(
+            self.round_key(room_code, round_number), player_ids
         )
-        if isinstance(result, Awaitable):
-            await result
+        if isinstance(file_infos, Awaitable):
+            file_infos = await file_infos
+        return sum(file_info is not None for file_info in file_infos)
 
-    async def get_all_files(
-        self, room: RoomModel
-    ) -> list[list[tuple[PlayerId, B64Data | None, B64Data | None]]]:
+    async def get_all_files(self, room: RoomModel) -> GameFiles:
         all_files = [[] for _ in range(len(room.player_ids))]
-        for round_num in range(1, len(room.player_ids) + 1):
-            content = self.redis_client.hgetall(f'game:{room.code}:round:{round_num}')
-            if isinstance(content, Awaitable):
-                content = await content
+        # Fetch every round's index in one round trip
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for round_num in range(1, len(room.player_ids) + 1):
+                pipe.hgetall(self.round_key(room.code, round_num))
+            rounds = await pipe.execute()
+        for round_num, content in enumerate(rounds, start=1):
             for i in range(0, len(room.player_ids)):
                 player_idx = (round_num + i - 1) % len(room.player_ids)
                 player_id = room.player_ids[player_idx]
                 file_info = content.get(player_id)
                 if file_info:
-                    file_paths = json.loads(file_info)
-                    with open(file_paths['original'], 'rb') as f:
-                        original_data = f.read()
-                        original_b64 = base64.b64encode(original_data).decode('utf-8')
-                    with open(file_paths['reversed'], 'rb') as f:
-                        reversed_data = f.read()
-                        reversed_b64 = base64.b64encode(reversed_data).decode('utf-8')
-                    all_files[i].append((player_id, original_b64, reversed_b64))
+                    round_file = RoundFile.from_json(file_info)
+                    all_files[i].append((player_id, *round_file))
                 else:
-                    all_files[i].append((player_id, None, None))
+                    all_files[i].append((player_id, None, None, None))
 
         return all_files
@@ -1,48 +1,92 @@
-import asyncio
+import base64
+import binascii
+import logging
 from uuid import uuid4
 
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect
 from pydantic import BaseModel, ValidationError
 
-from game_core.file_manager import FileManager
+from config import MAX_UPLOAD_BYTES, METRICS_ENABLED, WS_MAX_FRAME_BYTES
+from game_core.file_manager import FileManager, RoundFile
+from models.events import ClipReady
 from models.game import GameModel
 from models.request_schemas import (
-    REQUEST_TYPE_MESSAGE_MAP,
     RequestMessage,
     RequestType,
+    ResumeSessionRequest,
+    request_message_adapter,
 )
 from models.response_schemas import (
+    AudioRef,
+    AudioTransferNotification,
     ErrorResponse,
     GameRoundNotification,
     GameSummaryNotification,
+    ProtocolNegotiatedResponse,
     ResponseType,
     RoomCreatedResponse,
     RoomJoinedResponse,
     RoomLeftResponse,
     RoomUpdatedNotification,
+    RoundAudioNotification,
+    SessionResumedResponse,
 )
 from models.room import RoomModel
+from models.types import AudioTransport, FileKey, SessionToken
 
+from .audio_urls import sign_audio_url
+from .broadcast_cache import BroadcastCache, get_broadcast_cache
+from .logs import get_sampled_logger
+from .metrics import ACTIVE_SOCKETS, SUMMARY_BUILD_SECONDS, UPLOAD_BYTES, timer
+from .outbound_queue import OutboundQueue
 from .redis_manager import RedisManager
+from .reversal_engine import ReversalError
+from .round_scheduler import RoundScheduler, get_round_scheduler
+from .session_manager import SessionManager, get_session_manager
+from .storage import StorageFullError
+from .summary_builder import SummaryBuilder, get_summary_builder
 
-ROUND_DURATION = 30  # seconds
+logger = logging.getLogger(__name__)
+# Round and upload events, a sample of which is logged at DEBUG
+event_logger = get_sampled_logger(f'{__name__}.events')
 
 
 class GameController:
     websocket: WebSocket
     redis_manager: RedisManager
     file_manager: FileManager
+    summary_builder: SummaryBuilder
+    broadcast_cache: BroadcastCache
+    round_scheduler: RoundScheduler
+    session_manager: SessionManager
     _room: RoomModel | None
     _game: GameModel | None
     player_id: str
+    connection_id: str
+    session_token: SessionToken | None
+    audio_transport: AudioTransport
 
     def __init__(self, websocket: WebSocket):
         self.websocket = websocket
         self.redis_manager = RedisManager()
         self.file_manager = FileManager()
+        self.summary_builder = get_summary_builder()
+        self.broadcast_cache = get_broadcast_cache()
+        self.round_scheduler = get_round_scheduler()
+        self.session_manager = get_session_manager()
         self.player_id = str(uuid4())
+        self.connection_id = uuid4().hex
+        self.session_token = None
         self._room = None
         self._game = None
+        # Version of the last game event handled, see resend_missed_game_state
+        self._game_version = 0
+        # Round whose clip was already pushed by on_clip_ready
+        self._prefetched_round: int | None = None
+        self.audio_transport = AudioTransport.BASE64
+        self.outbound = OutboundQueue(websocket, degrade=self.degrade)
+        if METRICS_ENABLED:
+            ACTIVE_SOCKETS.inc()
 
     @property
     def room(self) -> RoomModel:
@@ -65,45 +109,186 @@ class GameController:
         self._game = value
 
     async def send_json(self, model: BaseModel):
-        await self.websocket.send_json(model.model_dump())
+        # Serialized by pydantic-core straight to JSON, no intermediate dict
+        await self.send_text(model.model_dump_json())
+
+    async def send_text(self, text: str, key: str | None = None):
+        """
+        Queue a message for this connection's writer. A queued message with
+        the same `key` is replaced instead.
+        """
+        self.outbound.put([text], key)
+
+    def degrade(self) -> bool:
+        """
+        Send audio as URLs from now on, since this client can't keep up with
+        inline audio. False if it already gets URLs.
+        """
+        if self.audio_transport == AudioTransport.URL:
+            return False
+        self.audio_transport = AudioTransport.URL
+        return True
+
+    async def send_audio(
+        self,
+        file_key: FileKey | None,
+        data: bytes | None = None,
+        transport: AudioTransport | None = None,
+    ) -> AudioRef | None:
+        """
+        Encode a stored clip for the negotiated transport. URL clients get a
+        signed link; binary audio is written immediately as a transfer header
+        plus frames and its transfer id is returned for the message that
+        references it. Pass `data` if the clip has already been read, and the
+        `transport` the referencing message declares, as degrade may switch
+        the connection's transport while that message is being built.
+        """
+        transport = transport or self.audio_transport
+        if file_key is None:
+            return None
+        if transport == AudioTransport.URL:
+            return sign_audio_url(file_key)
+
+        if data is None:
+            data = await self.file_manager.read_file(file_key)
+        if transport == AudioTransport.BASE64:
+            return base64.b64encode(data).decode('utf-8')
+
+        transfer_id = uuid4().hex
+        frames = [
+            data[i : i + WS_MAX_FRAME_BYTES]
+            for i in range(0, len(data), WS_MAX_FRAME_BYTES)
+        ]
+        header = AudioTransferNotification(
+            transfer_id=transfer_id, size=len(data), frame_count=len(frames)
+        )
+        # Queued as one entry so nothing is written between the frames
+        self.outbound.put([header.model_dump_json(), *frames], kind='audio')
+        return transfer_id
+
+    async def _receive_raw(self) -> dict:
+        message = await self.websocket.receive()
+        if message['type'] == 'websocket.disconnect':
+            raise WebSocketDisconnect(message.get('code', 1000))
+        return message
 
     async def receive_message(self) -> RequestMessage:
         while True:
-            req = await self.websocket.receive_json()
-            result = await self._validate_request(req)
-            if result is not None:
-                return result
+            message = await self._receive_raw()
+            if message.get('text') is None:
+                await self.send_json(
+                    ErrorResponse(
+                        error='Unexpected binary frame',
+                    )
+                )
+                continue
+            result = await self._validate_request(message['text'])
+            if result is None:
+                continue
+            if result.type == RequestType.NEGOTIATE:
+                await self.negotiate(result.audio_transport)
+                continue
+            return result
+
+    async def receive_upload(self, size: int) -> bytes | None:
+        """
+        Reassemble a binary upload of `size` bytes from the frames that follow
+        an upload_start message.
+        """
+        if self.audio_transport == AudioTransport.BASE64:
+            await self.send_json(
+                ErrorResponse(
+                    error='Binary transport has not been negotiated.',
+                )
+            )
+            return None
+        if not 0 < size <= MAX_UPLOAD_BYTES:
+            await self.send_json(
+                ErrorResponse(
+                    error='Upload is too large.',
+                )
+            )
+            return None
+
+        buffer = bytearray()
+        while len(buffer) < size:
+            frame = (await self._receive_raw()).get('bytes')
+            if frame is None:
+                await self.send_json(
+                    ErrorResponse(
+                        error='Expected a binary upload frame.',
+                    )
+                )
+                return None
+            if len(frame) > WS_MAX_FRAME_BYTES or len(buffer) + len(frame) > size:
+                await self.send_json(
+                    ErrorResponse(
+                        error='Upload frame exceeds the announced size.',
+                    )
+                )
+                return None
+            buffer.extend(frame)
+        return bytes(buffer)
 
-    async def _validate_request(self, req) -> RequestMessage | None:
-        validated_request = None
+    async def decode_upload(self, file_data: str) -> bytes | None:
+        """
+        Decode a base64 upload_file payload, checking its size before
+        decoding it.
+        """
+        if len(file_data) * 3 // 4 > MAX_UPLOAD_BYTES:
+            await self.send_json(
+                ErrorResponse(
+                    error='Upload is too large.',
+                )
+            )
+            return None
         try:
-            schema = REQUEST_TYPE_MESSAGE_MAP.get(RequestType(req.get('type')))
-        except ValidationError:
+            return base64.b64decode(file_data, validate=True)
+        except binascii.Error:
             await self.send_json(
                 ErrorResponse(
-                    type=ResponseType.ERROR,
-                    error='Invalid request type',
+                    error='Invalid file data',
                 )
             )
             return None
 
-        if schema is None:
+    async def negotiate(self, audio_transport: AudioTransport):
+        self.audio_transport = audio_transport
+        await self.send_json(
+            ProtocolNegotiatedResponse(
+                audio_transport=self.audio_transport,
+                max_frame_size=WS_MAX_FRAME_BYTES,
+                max_upload_size=MAX_UPLOAD_BYTES,
+            )
+        )
+
+    async def _validate_request(self, raw: str | bytes) -> RequestMessage | None:
+        try:
+            return request_message_adapter.validate_json(raw)
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_input=False)
+            invalid_type = any(
+                error['type'] in ('union_tag_invalid', 'union_tag_not_found')
+                for error in errors
+            )
             await self.send_json(
                 ErrorResponse(
                     type=ResponseType.ERROR,
-                    error='Invalid request payload',
+                    error='Invalid request type'
+                    if invalid_type
+                    else 'Invalid request payload',
                 )
             )
             return None
 
-        validated_request = schema(**req)
-        return validated_request
-
     async def create_room(self, host_player_name: str):
         room = await self.redis_manager.create_room(self.player_id, host_player_name)
         self.room = room
-        asyncio.create_task(
-            self.redis_manager.subscribe_to_room_events(room.code, self.on_room_update)
+        await self.redis_manager.subscribe_to_room_events(
+            room.code, self.on_room_update, since_version=room.version, catch_up=True
+        )
+        self.session_token = await self.session_manager.create(
+            self.player_id, room.code, self.connection_id
         )
 
     async def join_room(self, room_code: str, player_name: str) -> bool:
@@ -113,66 +298,301 @@ class GameController:
         if not room:
             return False
         self.room = room
-        asyncio.create_task(
-            self.redis_manager.subscribe_to_room_events(room.code, self.on_room_update)
+        await self.redis_manager.subscribe_to_room_events(
+            room.code, self.on_room_update, since_version=room.version, catch_up=True
+        )
+        self.session_token = await self.session_manager.create(
+            self.player_id, room.code, self.connection_id
         )
         return True
 
+    async def resume_session(self, request: ResumeSessionRequest) -> bool:
+        """
+        Take over the session of a dropped connection: same player id and
+        room. The room is resent only if it changed since the client's version.
+        """
+        session = await self.session_manager.attach(
+            request.session_token, self.connection_id
+        )
+        room = None
+        if session is not None:
+            room = await self.redis_manager.get_room(session.room_code)
+        if room is None or session.player_id not in room.player_ids:
+            await self.send_json(
+                ErrorResponse(
+                    error='Session expired',
+                )
+            )
+            return False
+
+        self.player_id = session.player_id
+        self.session_token = request.session_token
+        self.room = room
+        await self.redis_manager.subscribe_to_room_events(
+            room.code, self.on_room_update, since_version=room.version, catch_up=True
+        )
+        await self.send_json(
+            SessionResumedResponse(
+                player_id=self.player_id,
+                session_token=self.session_token,
+                room=self.room if self.room.version > request.room_version else None,
+            )
+        )
+        return True
+
+    async def resend_missed_game_state(self, round_number: int | None):
+        """
+        After resuming, send the current round (with its audio) if the client
+        is behind, or the summary if the game ended while it was away. Skipped
+        if a game event already arrived through the new subscription.
+        """
+        game = await self.redis_manager.get_game(self.room.code)
+        if game is not None:
+            if game.version <= self._game_version:
+                return
+            if game.round != round_number:
+                await self.on_game_update(game, game.version)
+            else:
+                # Still in the client's round: nothing to resend, but uploads
+                # and clip pushes need the game
+                self._game_version = game.version
+                self.game = game
+        elif round_number is not None and self._game_version == 0:
+            await self.on_game_update(
+                None, await self.redis_manager.get_version(self.room.code)
+            )
+
     async def leave_room(self):
+        await self.redis_manager.unsubscribe_all()
         await self.redis_manager.remove_player_from_room(self.room.code, self.player_id)
+        if self.session_token is not None:
+            await self.session_manager.delete(self.session_token)
+            self.session_token = None
         self._room = None
+        self._prefetched_round = None
 
-    async def on_room_update(self, room: RoomModel | None) -> None:
+    async def close(self):
+        """
+        Release this connection's subscriptions once its socket has closed, and
+        hold the player's seat for the session grace period.
+        """
+        if METRICS_ENABLED:
+            ACTIVE_SOCKETS.dec()
+        await self.outbound.close()
+        await self.redis_manager.unsubscribe_all()
+        if self.session_token is not None:
+            await self.session_manager.detach(self.session_token, self.connection_id)
+
+    async def on_room_update(self, room: RoomModel | None, version: int) -> None:
         if room is None:
             # TODO: Handle room deletion
             return
         self.room = room
-        await self.send_json(
-            RoomUpdatedNotification(
-                room=self.room,
+
+        async def build() -> str:
+            return RoomUpdatedNotification(room=room).model_dump_json()
+
+        # Serialized once per version for every connection in the room. Only
+        # the latest room state is worth sending to a client that is behind.
+        await self.send_text(
+            await self.broadcast_cache.get((room.code, version, 'room'), build),
+            key='room',
+        )
+
+    async def summary_notification(self) -> GameSummaryNotification:
+        with timer(SUMMARY_BUILD_SECONDS, self.audio_transport.value):
+            return await self._summary_notification()
+
+    async def _summary_notification(self) -> GameSummaryNotification:
+        transport = self.audio_transport
+        game_files = await self.summary_builder.get_summary(self.room)
+        contents = {}
+        if transport != AudioTransport.URL:
+            contents = await self.file_manager.read_files(
+                [
+                    file_key
+                    for rounds in game_files
+                    for _, original, reversed_, _ in rounds
+                    for file_key in (original, reversed_)
+                    if file_key is not None
+                ]
             )
+        files = [
+            [
+                (
+                    player_id,
+                    await self.send_audio(original, contents.get(original), transport),
+                    await self.send_audio(
+                        reversed_, contents.get(reversed_), transport
+                    ),
+                    waveform,
+                )
+                for player_id, original, reversed_, waveform in rounds
+            ]
+            for rounds in game_files
+        ]
+        return GameSummaryNotification(
+            files=files,
+            audio_transport=transport,
         )
 
-    async def on_game_update(self, game: GameModel | None) -> None:
+    async def on_game_update(self, game: GameModel | None, version: int) -> None:
+        self._game_version = version
         if game is None:
-            game_files = await self.file_manager.get_all_files(self.room)
             self._game = None
-            await self.send_json(
-                GameSummaryNotification(
-                    files=game_files,
+            self._prefetched_round = None
+            if self.audio_transport == AudioTransport.BINARY:
+                # Transfer ids are per connection, so this can't be shared
+                await self.send_json(await self.summary_notification())
+                return
+
+            async def build() -> str:
+                return (await self.summary_notification()).model_dump_json()
+
+            # Everyone in the room gets the same summary; with base64 audio,
+            # reading and encoding every clip once is most of the work
+            await self.send_text(
+                await self.broadcast_cache.get(
+                    (self.room.code, version, 'summary', self.audio_transport), build
                 )
             )
             return
+        if self._game is None or game.round < self._game.round:
+            # A new game; pushes from the last one don't count
+            self._prefetched_round = None
         self.game = game
+        if self._prefetched_round == game.round:
+            # The client already holds this round's clip
+            await self.send_json(
+                GameRoundNotification(
+                    round_number=game.round,
+                    audio=None,
+                    audio_transport=self.audio_transport,
+                    audio_prefetched=True,
+                )
+            )
+            return
         # Find the i-th player after self.player_id, wrapping around
-        print(f'Game update: {game}, self.player_id: {self.player_id}')
         player_ids = self.room.player_ids
         idx = player_ids.index(self.player_id)
         author_idx = (idx + game.round - 1) % len(player_ids)
         self.file_author = player_ids[author_idx]
-        print(
-            f'File author for round {game.round} for player {self.player_id} is {self.file_author}'
+        event_logger.debug(
+            'Room %s round %d: player %s gets the clip of %s',
+            self.room.code,
+            game.round,
+            self.player_id,
+            self.file_author,
         )
-        audio_file = await self.file_manager.get_round_file(
+        round_file = await self.file_manager.get_round_file(
             self.room.code, game.round - 1, self.file_author
         )
+        transport = self.audio_transport
         await self.send_json(
             GameRoundNotification(
                 round_number=game.round,
-                audio=audio_file,
+                audio=await self.send_audio(
+                    round_file and round_file.reversed, transport=transport
+                ),
+                audio_transport=transport,
+                waveform=round_file and round_file.reversed_waveform,
             )
         )
 
-    async def start_round_timer(self):
-        await asyncio.sleep(ROUND_DURATION)
-        await self.redis_manager.next_round(self.room.code)
-        if self.game.round < len(self.room.player_ids) - 1:
-            asyncio.create_task(self.start_round_timer())
-        else:
-            await asyncio.sleep(ROUND_DURATION)
-            await self.redis_manager.end_game(self.room.code)
+    async def on_clip_ready(self, clip: ClipReady) -> None:
+        """
+        Push the clip this player will mimic next round as soon as it has been
+        reversed, instead of with the round change.
+        """
+        if clip.recipient_id != self.player_id or self._game is None:
+            return
+        if clip.round_number < self.game.round:
+            return
+        transport = self.audio_transport
+        audio = await self.send_audio(clip.file_key, transport=transport)
+        await self.send_json(
+            RoundAudioNotification(
+                round_number=clip.round_number,
+                audio=audio,
+                audio_transport=transport,
+                waveform=clip.waveform,
+            )
+        )
+        self._prefetched_round = clip.round_number
+
+    async def publish_clip(self, round_number: int, round_file: RoundFile) -> None:
+        """
+        Announce this player's clip for `round_number` to whoever mimics it in
+        the following round, if there is one.
+        """
+        player_ids = self.room.player_ids
+        if round_number >= len(player_ids):
+            return
+        # Inverse of the author lookup in on_game_update
+        author_idx = player_ids.index(self.player_id)
+        recipient_idx = (author_idx - round_number) % len(player_ids)
+        await self.redis_manager.publish_clip_ready(
+            self.room.code,
+            ClipReady(
+                recipient_id=player_ids[recipient_idx],
+                round_number=round_number + 1,
+                file_key=round_file.reversed,
+                waveform=round_file.reversed_waveform,
+            ),
+        )
+
+    async def upload_file(self, round_number: int, file_data: bytes):
+        event_logger.debug(
+            'Room %s round %d: %d byte upload from %s',
+            self.room.code,
+            round_number,
+            len(file_data),
+            self.player_id,
+        )
+        if METRICS_ENABLED:
+            UPLOAD_BYTES.labels(self.audio_transport.value).observe(len(file_data))
+        if len(file_data) > MAX_UPLOAD_BYTES:
+            await self.send_json(
+                ErrorResponse(
+                    error='Upload is too large.',
+                )
+            )
+            return
+        try:
+            round_file = await self.file_manager.save_round_file(
+                self.room.code,
+                round_number,
+                self.player_id,
+                file_data,
+            )
+        except ReversalError as e:
+            logger.warning('Failed to process upload from %s: %s', self.player_id, e)
+            await self.send_json(
+                ErrorResponse(
+                    error='Failed to process audio file.',
+                )
+            )
+            return
+        except StorageFullError as e:
+            logger.warning('Rejected upload from %s: %s', self.player_id, e)
+            await self.send_json(
+                ErrorResponse(
+                    error='Server storage is full, please try again later.',
+                )
+            )
+            return
+
+        await self.publish_clip(round_number, round_file)
+
+        # Everyone has recorded, no need to wait out the timer
+        uploads = await self.file_manager.count_round_files(
+            self.room.code, round_number, self.room.player_ids
+        )
+        if uploads >= len(self.room.player_ids):
+            await self.round_scheduler.end_round_early(self.room.code, round_number)
 
     async def run(self):
+        resumed: ResumeSessionRequest | None = None
         while self._room is None:
             req_message = await self.receive_message()
 
@@ -181,6 +601,7 @@ class GameController:
                 await self.send_json(
                     RoomCreatedResponse(
                         room=self.room,
+                        session_token=self.session_token,
                     )
                 )
 
@@ -197,20 +618,33 @@ class GameController:
                     )
                 else:
                     await self.send_json(
-                        RoomJoinedResponse(room=self.room, player_id=self.player_id)
+                        RoomJoinedResponse(
+                            room=self.room,
+                            player_id=self.player_id,
+                            session_token=self.session_token,
+                        )
                     )
 
+            elif req_message.type == RequestType.RESUME_SESSION:
+                if await self.resume_session(req_message):
+                    resumed = req_message
+
             else:
                 await self.send_json(
                     ErrorResponse(
                         error='No room joined yet',
                     )
                 )
-        asyncio.create_task(
-            self.redis_manager.subscribe_to_game_events(
-                self.room.code, self.on_game_update
-            )
+        # A game started while this player was joining is picked up here;
+        # resend_missed_game_state does the same for a resumed session
+        await self.redis_manager.subscribe_to_game_events(
+            self.room.code, self.on_game_update, catch_up=resumed is None
+        )
+        await self.redis_manager.subscribe_to_clip_events(
+            self.room.code, self.on_clip_ready
         )
+        if resumed is not None:
+            await self.resend_missed_game_state(resumed.round_number)
 
         while True:
             req_message = await self.receive_message()
@@ -231,8 +665,11 @@ class GameController:
                             )
                         )
                         continue
-                    await self.redis_manager.start_game(self.room.code)
-                    asyncio.create_task(self.start_round_timer())
+                    game = await self.redis_manager.start_game(self.room.code)
+                    if game is not None:
+                        await self.round_scheduler.schedule_round(
+                            self.room.code, game.round
+                        )
                 elif req_message.type == RequestType.LEAVE_ROOM:
                     await self.leave_room()
                     await self.send_json(RoomLeftResponse())
@@ -247,16 +684,13 @@ class GameController:
 
             else:
                 if req_message.type == RequestType.UPLOAD_FILE:
-                    print(
-                        f'Received file upload for round {req_message.round_number} '
-                        f'from player {self.player_id}'
-                    )
-                    await self.file_manager.save_round_file(
-                        self.room.code,
-                        req_message.round_number,
-                        self.player_id,
-                        req_message.file_data,
-                    )
+                    file_data = await self.decode_upload(req_message.file_data)
+                    if file_data is not None:
+                        await self.upload_file(req_message.round_number, file_data)
+                elif req_message.type == RequestType.UPLOAD_START:
+                    file_data = await self.receive_upload(req_message.size)
+                    if file_data is not None:
+                        await self.upload_file(req_message.round_number, file_data)
                 else:
                     await self.send_json(
                         ErrorResponse(
@@ -0,0 +1,36 @@
+import logging
+import random
+
+from config import LOG_LEVEL, LOG_SAMPLE_RATE
+
+
+class SampleFilter(logging.Filter):
+    """
+    Lets through `rate` of the records below WARNING. Warnings and errors
+    always pass.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate  # noqa: S311
+
+
+def get_sampled_logger(name: str, rate: float = LOG_SAMPLE_RATE) -> logging.Logger:
+    """
+    A logger for per-message events, too frequent to write every one of.
+    """
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, SampleFilter) for f in logger.filters):
+        logger.addFilter(SampleFilter(rate))
+    return logger
+
+
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    logging.basicConfig(
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s',
+    )
+    for name in ('app', 'game_core'):
+        logging.getLogger(name).setLevel(level)
@@ -0,0 +1,166 @@
+import functools
+import os
+from contextlib import nullcontext
+from time import perf_counter
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from config import METRICS_ENABLED, PROMETHEUS_MULTIPROC_DIR
+
+# Latency buckets in seconds, from sub-millisecond Redis calls to slow reversals
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = tuple(2**i * 1024 for i in range(0, 14, 1))  # 1 KiB to 8 MiB
+
+# Returned by timer when metrics are disabled; reusable and free
+_NULL_TIMER = nullcontext()
+
+
+def timer(histogram: Histogram, *values: str):
+    """
+    Context manager observing the duration of its block, or a no-op when
+    metrics are disabled.
+    """
+    if not METRICS_ENABLED:
+        return _NULL_TIMER
+    return histogram.labels(*values).time()
+
+
+def timed(histogram: Histogram, *values: str):
+    """
+    Decorator observing how long each call of an async function takes. Returns
+    the function unchanged when metrics are disabled.
+    """
+
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+        child = histogram.labels(*values)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                child.observe(perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def render() -> bytes:
+    """
+    Every metric in the Prometheus text format. With PROMETHEUS_MULTIPROC_DIR
+    set, the samples of every uvicorn worker are read from that directory and
+    aggregated, so it doesn't matter which worker answers the scrape.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def close_metrics() -> None:
+    """
+    Drop this worker's live gauges from the shared samples as it shuts down.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+REVERSAL_SECONDS = Histogram(
+    'retronome_reversal_seconds',
+    'Time to reverse an uploaded clip, including waiting for a worker.',
+    ('backend',),
+    buckets=DEFAULT_BUCKETS,
+)
+REVERSAL_ERRORS = Counter(
+    'retronome_reversal_errors',
+    'Reversals that failed or timed out.',
+    ('backend',),
+)
+REDIS_SECONDS = Histogram(
+    'retronome_redis_seconds',
+    'Latency of RedisManager calls.',
+    ('method',),
+    buckets=DEFAULT_BUCKETS,
+)
+WS_SEND_SECONDS = Histogram(
+    'retronome_ws_send_seconds',
+    'Time from queueing an outbound WebSocket message until it is written.',
+    ('kind',),
+    buckets=DEFAULT_BUCKETS,
+)
+# Gauges are summed over the workers that are still running
+WS_SEND_QUEUE_DEPTH = Gauge(
+    'retronome_ws_send_queue_depth',
+    'Outbound WebSocket messages waiting to be written, over all connections.',
+    multiprocess_mode='livesum',
+)
+WS_SEND_QUEUE_BYTES = Gauge(
+    'retronome_ws_send_queue_bytes',
+    'Bytes of outbound WebSocket messages waiting to be written.',
+    multiprocess_mode='livesum',
+)
+WS_COALESCED = Counter(
+    'retronome_ws_coalesced',
+    'Queued room updates replaced by a newer one before they were sent.',
+)
+WS_SLOW_CONSUMERS = Counter(
+    'retronome_ws_slow_consumers',
+    'Connections whose outbound queue filled up, by what was done about it.',
+    ('action',),
+)
+ACTIVE_SOCKETS = Gauge(
+    'retronome_active_sockets',
+    'Open /game/ WebSocket connections.',
+    multiprocess_mode='livesum',
+)
+ACTIVE_ROOMS = Gauge(
+    'retronome_active_rooms',
+    'Rooms with at least one connection, counted once per worker they are on.',
+    multiprocess_mode='livesum',
+)
+UPLOAD_BYTES = Histogram(
+    'retronome_upload_bytes',
+    'Size of uploaded clips.',
+    ('transport',),
+    buckets=SIZE_BUCKETS,
+)
+ENCODED_BYTES = Counter(
+    'retronome_encoded_bytes',
+    'Bytes of uploaded clips and of the forward clips stored for them, by '
+    'encoding profile.',
+    ('profile', 'stage'),
+)
+SUMMARY_BUILD_SECONDS = Histogram(
+    'retronome_summary_build_seconds',
+    'Time to assemble a game summary notification.',
+    ('transport',),
+    buckets=DEFAULT_BUCKETS,
+)
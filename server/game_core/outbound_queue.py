@@ -0,0 +1,190 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Callable
+from time import perf_counter
+
+from fastapi import WebSocket
+
+from config import (
+    METRICS_ENABLED,
+    WS_QUEUE_MAX_BYTES,
+    WS_QUEUE_MAX_DELAY,
+    WS_QUEUE_MAX_MESSAGES,
+    WS_SLOW_CONSUMER_POLICY,
+)
+
+from .metrics import (
+    WS_COALESCED,
+    WS_SEND_QUEUE_BYTES,
+    WS_SEND_QUEUE_DEPTH,
+    WS_SEND_SECONDS,
+    WS_SLOW_CONSUMERS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Close code for slow consumers: "try again later", so clients reconnect
+TRY_AGAIN_LATER = 1013
+
+
+class _Entry:
+    __slots__ = ('frames', 'size', 'key', 'kind', 'queued_at')
+
+    def __init__(self, frames: list[str | bytes], key: str | None, kind: str):
+        self.frames = frames
+        self.size = sum(len(frame) for frame in frames)
+        self.key = key
+        self.kind = kind
+        self.queued_at = perf_counter()
+
+
+class OutboundQueue:
+    """
+    Bounded queue of one connection's outbound messages, written by its own
+    task so a slow client never holds up the pub/sub dispatch feeding it.
+
+    An entry is one message, or several frames written back to back (an audio
+    transfer header and its binary frames). Entries put with a `key` replace
+    the queued entry with the same key, so only the latest room state is sent.
+
+    A client is a slow consumer once the oldest entry has waited more than
+    `max_delay` seconds, or more than `max_messages` entries or `max_bytes`
+    bytes are waiting. Bursts (a summary's audio transfers) are fine as long
+    as they drain. With the 'degrade' policy `degrade` is called first and, if
+    it lightens future messages, the entry is queued anyway; the next
+    overflow, or any overflow under the 'disconnect' policy, closes the socket
+    so the client reconnects and resumes its session.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        degrade: Callable[[], bool] | None = None,
+        max_delay: float = WS_QUEUE_MAX_DELAY,
+        max_messages: int = WS_QUEUE_MAX_MESSAGES,
+        max_bytes: int = WS_QUEUE_MAX_BYTES,
+        policy: str = WS_SLOW_CONSUMER_POLICY,
+    ):
+        self.websocket = websocket
+        self.degrade = degrade
+        self.max_delay = max_delay
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.closed = False
+        self._entries: deque[_Entry] = deque()
+        self._keyed: dict[str, _Entry] = {}
+        self._bytes = 0
+        # Delays are measured from here at the earliest; reset on degrading
+        self._delay_from = 0.0
+        self._ready = asyncio.Event()
+        self._writer: asyncio.Task | None = None
+
+    def put(
+        self, frames: list[str | bytes], key: str | None = None, kind: str = 'text'
+    ) -> None:
+        if self.closed:
+            return
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write())
+
+        if key is not None:
+            queued = self._keyed.get(key)
+            if queued is not None:
+                # Superseded before it was sent; keep its place in the queue
+                size = sum(len(frame) for frame in frames)
+                self._add_bytes(size - queued.size)
+                queued.frames = frames
+                queued.size = size
+                if METRICS_ENABLED:
+                    WS_COALESCED.inc()
+                return
+
+        entry = _Entry(frames, key, kind)
+        # A single message is always accepted, however large
+        if self._entries and (
+            entry.queued_at - max(self._entries[0].queued_at, self._delay_from)
+            > self.max_delay
+            or len(self._entries) >= self.max_messages
+            or self._bytes + entry.size > self.max_bytes
+        ):
+            if not self._overflow():
+                return
+        self._entries.append(entry)
+        if key is not None:
+            self._keyed[key] = entry
+        self._add_bytes(entry.size)
+        if METRICS_ENABLED:
+            WS_SEND_QUEUE_DEPTH.inc()
+        self._ready.set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def close(self) -> None:
+        """
+        Stop writing and drop whatever is still queued.
+        """
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        if METRICS_ENABLED:
+            WS_SEND_QUEUE_DEPTH.dec(len(self._entries))
+        self._add_bytes(-self._bytes)
+        self._entries.clear()
+        self._keyed.clear()
+
+    def _overflow(self) -> bool:
+        if self.policy == 'degrade' and self.degrade is not None and self.degrade():
+            if METRICS_ENABLED:
+                WS_SLOW_CONSUMERS.labels('degraded').inc()
+            self._delay_from = perf_counter()
+            logger.info('Degraded slow consumer, %d bytes queued', self._bytes)
+            return True
+        if METRICS_ENABLED:
+            WS_SLOW_CONSUMERS.labels('disconnected').inc()
+        logger.info('Disconnecting slow consumer, %d bytes queued', self._bytes)
+        asyncio.create_task(self._disconnect())
+        return False
+
+    async def _disconnect(self) -> None:
+        await self.close()
+        try:
+            await self.websocket.close(code=TRY_AGAIN_LATER)
+        except Exception as e:
+            logger.debug('Closing slow consumer failed: %s', e)
+
+    def _add_bytes(self, size: int) -> None:
+        self._bytes += size
+        if METRICS_ENABLED:
+            WS_SEND_QUEUE_BYTES.inc(size)
+
+    async def _write(self) -> None:
+        while True:
+            while not self._entries:
+                self._ready.clear()
+                await self._ready.wait()
+            entry = self._entries.popleft()
+            if entry.key is not None:
+                del self._keyed[entry.key]
+            self._add_bytes(-entry.size)
+            if METRICS_ENABLED:
+                WS_SEND_QUEUE_DEPTH.dec()
+            try:
+                for frame in entry.frames:
+                    if isinstance(frame, str):
+                        await self.websocket.send_text(frame)
+                    else:
+                        await self.websocket.send_bytes(frame)
+            except Exception as e:
+                # The connection is gone; its receive loop will notice
+                logger.debug('Outbound write failed: %s', e)
+                self._writer = None
+                await self.close()
+                return
+            if METRICS_ENABLED:
+                WS_SEND_SECONDS.labels(entry.kind).observe(
+                    perf_counter() - entry.queued_at
+                )
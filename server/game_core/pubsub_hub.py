@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from clients.redis_client import get_redis_client
+from config import METRICS_ENABLED
+
+from .metrics import ACTIVE_ROOMS
+
+logger = logging.getLogger(__name__)
+
+# Returned by a channel's decoder for messages its handlers should not see
+IGNORE = object()
+
+Handler = Callable[[Any], Awaitable[None]]
+Decoder = Callable[[str], Awaitable[Any]]
+
+
+class ChannelSubscription:
+    """
+    Local fan-out for one Redis channel. Messages are decoded once and handed to
+    every registered handler, in order, by the channel's own dispatch task so a
+    slow room never holds up another room's messages.
+    """
+
+    def __init__(self, channel: str, decode: Decoder):
+        self.channel = channel
+        self.decode = decode
+        self.handlers: list[Handler] = []
+        self.queue: asyncio.Queue[str] = asyncio.Queue()
+        self.task = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while True:
+            data = await self.queue.get()
+            try:
+                value = await self.decode(data)
+                if value is IGNORE:
+                    continue
+                results = await asyncio.gather(
+                    *(handler(value) for handler in list(self.handlers)),
+                    return_exceptions=True,
+                )
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error(
+                            'Error handling message on %s',
+                            self.channel,
+                            exc_info=result,
+                        )
+            except Exception:
+                logger.exception('Error decoding message on %s', self.channel)
+
+
+class PubSubHub:
+    """
+    Process-wide Redis pub/sub multiplexer.
+
+    The worker holds a single pub/sub connection with one subscription per
+    channel, however many local connections are interested in it. Subscriptions
+    are reference-counted by handler and dropped when the last one goes away.
+    """
+
+    def __init__(self):
+        self.redis_client = get_redis_client()
+        self._pubsub = None
+        self._listener: asyncio.Task | None = None
+        self._channels: dict[str, ChannelSubscription] = {}
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, channel: str, handler: Handler, decode: Decoder):
+        """
+        Register `handler` for `channel`. The first subscriber's `decode` is
+        used for the channel; it runs once per message, not once per handler.
+        """
+        async with self._lock:
+            subscription = self._channels.get(channel)
+            if subscription is None:
+                if self._pubsub is None:
+                    self._pubsub = self.redis_client.pubsub()
+                await self._pubsub.subscribe(channel)
+                subscription = ChannelSubscription(channel, decode)
+                self._channels[channel] = subscription
+                self._count_rooms()
+            subscription.handlers.append(handler)
+
+            if self._listener is None or self._listener.done():
+                self._listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, channel: str, handler: Handler):
+        async with self._lock:
+            subscription = self._channels.get(channel)
+            if subscription is None or handler not in subscription.handlers:
+                return
+            subscription.handlers.remove(handler)
+            if subscription.handlers:
+                return
+            del self._channels[channel]
+            self._count_rooms()
+            subscription.task.cancel()
+            await self._pubsub.unsubscribe(channel)
+
+    def channel_count(self) -> int:
+        return len(self._channels)
+
+    def _count_rooms(self) -> None:
+        if METRICS_ENABLED:
+            # Every channel is one room's events
+            ACTIVE_ROOMS.set(len(self._channels))
+
+    def subscriber_count(self, channel: str) -> int:
+        subscription = self._channels.get(channel)
+        return len(subscription.handlers) if subscription else 0
+
+    async def close(self):
+        async with self._lock:
+            if self._listener is not None:
+                self._listener.cancel()
+                self._listener = None
+            for subscription in self._channels.values():
+                subscription.task.cancel()
+            self._channels.clear()
+            self._count_rooms()
+            if self._pubsub is not None:
+                await self._pubsub.aclose()
+                self._pubsub = None
+
+    async def _listen(self):
+        while self._channels:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except Exception as e:
+                logger.warning('Pub/sub connection error: %s', e)
+                await asyncio.sleep(1.0)
+                continue
+            if message is None or message['type'] != 'message':
+                continue
+            subscription = self._channels.get(message['channel'])
+            if subscription is not None:
+                subscription.queue.put_nowait(message['data'])
+
+
+pubsub_hub = PubSubHub()
+
+
+def get_pubsub_hub() -> PubSubHub:
+    return pubsub_hub
@@ -1,152 +1,316 @@
-import secrets
-import string
+import asyncio
 from collections.abc import Awaitable
 from typing import Callable, Optional
 
 from clients.redis_client import get_redis_client
+from config import ROOM_CODE_FALLBACK_LENGTH, ROOM_CODE_POOL_LOW_WATER, ROOM_TTL
+from models.events import ClipReady, RoomEvent, RoomEventKind
 from models.game import GameModel
 from models.room import RoomModel
 from models.types import RoomId
 
+from . import redis_scripts
+from .metrics import REDIS_SECONDS, timed
+from .pubsub_hub import get_pubsub_hub
+from .room_codes import ALLOCATED_CODES_KEY, FREE_CODES_KEY, random_room_code
+
 
 class RedisManager:
     def __init__(self):
         self.redis_client = get_redis_client()
-        self._pubsub = None
-        self._channel = None
+        self.pubsub_hub = get_pubsub_hub()
+        # (channel, handler) pairs this manager registered with the hub
+        self._subscriptions: list[tuple[str, Callable]] = []
+
+        self._save = self.redis_client.register_script(redis_scripts.SAVE_SNAPSHOT)
+        self._delete_snapshot = self.redis_client.register_script(
+            redis_scripts.DELETE_SNAPSHOT
+        )
+        self._add_player = self.redis_client.register_script(redis_scripts.ADD_PLAYER)
+        self._remove_player = self.redis_client.register_script(
+            redis_scripts.REMOVE_PLAYER
+        )
+        self._defer_player_removal = self.redis_client.register_script(
+            redis_scripts.DEFER_PLAYER_REMOVAL
+        )
+        self._start_game = self.redis_client.register_script(redis_scripts.START_GAME)
+        self._next_round = self.redis_client.register_script(redis_scripts.NEXT_ROUND)
+        self._create_room = self.redis_client.register_script(redis_scripts.CREATE_ROOM)
 
+    @timed(REDIS_SECONDS, 'room_exists')
     async def room_exists(self, room_code: str) -> bool:
         return await self.redis_client.exists(f'room:{room_code}') > 0
 
+    @timed(REDIS_SECONDS, 'get_room')
     async def get_room(self, room_code: str) -> Optional[RoomModel]:
         room_data = await self.redis_client.get(f'room:{room_code}')
         if not room_data:
             return None
         return RoomModel.model_validate_json(room_data)
 
+    @timed(REDIS_SECONDS, 'get_game')
     async def get_game(self, room_code: str) -> Optional[GameModel]:
         game_data = await self.redis_client.get(f'room:{room_code}:game')
         if not game_data:
             return None
         return GameModel.model_validate_json(game_data)
 
+    @timed(REDIS_SECONDS, 'get_version')
+    async def get_version(self, room_code: str) -> int:
+        """
+        The room's latest event version, shared by room and game events.
+        """
+        return int(await self.redis_client.get(self._version_key(room_code)) or 0)
+
+    @timed(REDIS_SECONDS, 'save_room')
     async def save_room(self, room: RoomModel):
-        await self.redis_client.set(
-            f'room:{room.code}',
-            room.model_dump_json(),
+        room_data = await self._save(
+            keys=[f'room:{room.code}', self._version_key(room.code)],
+            args=[
+                self._events_channel(room.code),
+                ROOM_TTL,
+                RoomEventKind.ROOM.value,
+                room.model_dump_json(),
+            ],
         )
+        room.version = RoomModel.model_validate_json(room_data).version
 
+    @timed(REDIS_SECONDS, 'create_room')
     async def create_room(
         self, host_player_id: str, host_player_name: str
     ) -> RoomModel:
-        letters = string.ascii_uppercase
-        while True:
-            random_code = ''.join(secrets.choice(letters) for _ in range(4))
-            if not await self.room_exists(random_code):
-                break
+        """
+        Allocate a code from the room code pool and create the room with it in
+        a single round trip.
+        """
         room = RoomModel(
-            code=random_code,
+            code='',
             player_ids=[host_player_id],
             player_names={host_player_id: host_player_name},
             host_id=host_player_id,
         )
-        await self.save_room(room)
-        return room
+        while True:
+            room_data = await self._create_room(
+                keys=[FREE_CODES_KEY, ALLOCATED_CODES_KEY],
+                args=[
+                    ROOM_TTL,
+                    ROOM_CODE_POOL_LOW_WATER,
+                    random_room_code(ROOM_CODE_FALLBACK_LENGTH),
+                    room.model_dump_json(),
+                ],
+            )
+            # Only nil if the pool was low and the fallback code was taken
+            if room_data:
+                return RoomModel.model_validate_json(room_data)
 
+    @timed(REDIS_SECONDS, 'add_player_to_room')
     async def add_player_to_room(
         self, room_code: str, player_id: str, player_name: str
     ) -> Optional[RoomModel]:
-        room = await self.get_room(room_code)
-        if not room:
+        room_data = await self._add_player(
+            keys=[f'room:{room_code}', self._version_key(room_code)],
+            args=[self._events_channel(room_code), ROOM_TTL, player_id, player_name],
+        )
+        if not room_data:
             return None
-        room.player_ids.append(player_id)
-        room.player_names[player_id] = player_name
-        await self.save_room(room)
-        return room
+        return RoomModel.model_validate_json(room_data)
 
+    @timed(REDIS_SECONDS, 'remove_player_from_room')
     async def remove_player_from_room(
         self, room_code: str, player_id: str
     ) -> Optional[RoomModel]:
-        room = await self.get_room(room_code)
-        await self.unsubscribe_from_room_events()
-        if not room:
+        room_data = await self._remove_player(
+            keys=[f'room:{room_code}', self._version_key(room_code)],
+            args=[self._events_channel(room_code), ROOM_TTL, player_id],
+        )
+        if not room_data:
             return None
-        if player_id in room.player_ids:
-            player_index = room.player_ids.index(player_id)
-            del room.player_names[player_id]
-            del room.player_ids[player_index]
-            # If the player leaving is the host, assign a new host if possible
-            if player_id == room.host_id:
-                if room.player_ids:
-                    room.host_id = room.player_ids[0]
-                else:
-                    await self.redis_client.delete(f'room:{room_code}')
-                    return None
-            await self.save_room(room)
-        return room
-
-    async def start_game(self, room_code: str) -> None:
-        room = await self.get_room(room_code)
-        if not room:
+        return RoomModel.model_validate_json(room_data)
+
+    @timed(REDIS_SECONDS, 'remove_player_after_game')
+    async def remove_player_after_game(self, room_code: str, player_id: str) -> None:
+        """
+        Remove a player who is gone for good, waiting for the end of the game
+        if one is running: its rounds and summary are laid out by position in
+        player_ids.
+        """
+        if not await self._defer_player_removal(
+            keys=[f'room:{room_code}:game', self._departed_key(room_code)],
+            args=[player_id, ROOM_TTL],
+        ):
+            await self.remove_player_from_room(room_code, player_id)
+
+    @timed(REDIS_SECONDS, 'start_game')
+    async def start_game(self, room_code: str) -> Optional[GameModel]:
+        game_data = await self._start_game(
+            keys=[
+                f'room:{room_code}:game',
+                self._version_key(room_code),
+                f'room:{room_code}',
+                f'game:{room_code}:summary',
+            ],
+            args=[
+                self._events_channel(room_code),
+                ROOM_TTL,
+                room_code,
+                f'game:{room_code}:round:',
+            ],
+        )
+        if not game_data:
             return None
-        game = GameModel(
-            room=room_code,
-            round=1,
+        return GameModel.model_validate_json(game_data)
+
+    @timed(REDIS_SECONDS, 'next_round')
+    async def next_round(
+        self, room_code: str, expected_round: int | None = None
+    ) -> Optional[GameModel]:
+        """
+        Advance to the next round. With `expected_round`, only advance if the
+        game is still in that round, so competing callers bump it once.
+        """
+        game_data = await self._next_round(
+            keys=[f'room:{room_code}:game', self._version_key(room_code)],
+            args=[
+                self._events_channel(room_code),
+                ROOM_TTL,
+                '' if expected_round is None else expected_round,
+            ],
         )
-        await self.redis_client.set(
-            f'room:{room_code}:game',
-            game.model_dump_json(),
+        if not game_data:
+            return None
+        return GameModel.model_validate_json(game_data)
+
+    @timed(REDIS_SECONDS, 'end_game')
+    async def end_game(self, room_code: str) -> None:
+        await self._delete_snapshot(
+            keys=[f'room:{room_code}:game', self._version_key(room_code)],
+            args=[
+                self._events_channel(room_code),
+                ROOM_TTL,
+                RoomEventKind.GAME.value,
+            ],
         )
-        return
+        # Players whose sessions expired during the game can go now
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.smembers(self._departed_key(room_code))
+            pipe.delete(self._departed_key(room_code))
+            departed, _ = await pipe.execute()
+        for player_id in departed:
+            await self.remove_player_from_room(room_code, player_id)
 
-    async def next_round(self, room_code: str) -> None:
-        game = await self.get_game(room_code)
-        if not game:
-            return None
-        game.round += 1
-        await self.redis_client.set(
-            f'room:{room_code}:game',
-            game.model_dump_json(),
+    @timed(REDIS_SECONDS, 'publish_clip_ready')
+    async def publish_clip_ready(self, room_code: str, clip: ClipReady) -> None:
+        event = RoomEvent(kind=RoomEventKind.CLIP, version=0, clip=clip)
+        await self.redis_client.publish(
+            self._events_channel(room_code), event.model_dump_json()
         )
 
-    async def end_game(self, room_code: str) -> None:
-        await self.redis_client.delete(f'room:{room_code}:game')
+    @staticmethod
+    def _version_key(room_code: str) -> str:
+        return f'room:{room_code}:version'
+
+    @staticmethod
+    def _departed_key(room_code: str) -> str:
+        return f'room:{room_code}:departed'
+
+    @staticmethod
+    def _events_channel(room_code: str) -> str:
+        return f'room:{room_code}:events'
 
     async def subscribe_to_room_events(
         self,
         room_code: RoomId,
-        on_update: Callable[[RoomModel | None], Awaitable[None]],
+        on_update: Callable[[RoomModel | None, int], Awaitable[None]],
+        since_version: int = 0,
+        catch_up: bool = False,
     ):
-        self._pubsub = self.redis_client.pubsub()
-        key = f'room:{room_code}'
-        self._channel = f'__keyspace@0__:{key}'
-
-        await self._pubsub.subscribe(self._channel)
-        async for message in self._pubsub.listen():
-            if message['type'] == 'message':
-                updated_room = await self.get_room(room_code)
-                await on_update(updated_room)
-
-    async def unsubscribe_from_room_events(self):
-        if self._pubsub and self._channel:
-            await self._pubsub.unsubscribe(self._channel)
-            await self._pubsub.close()
-            self._pubsub = None
-            self._channel = None
+        await self._subscribe_to_events(
+            room_code,
+            RoomEventKind.ROOM,
+            since_version,
+            on_update,
+            self.get_room if catch_up else None,
+        )
 
     async def subscribe_to_game_events(
         self,
         room_code: str,
-        on_update: Callable[[GameModel | None], Awaitable[None]],
+        on_update: Callable[[GameModel | None, int], Awaitable[None]],
+        since_version: int = 0,
+        catch_up: bool = False,
+    ):
+        await self._subscribe_to_events(
+            room_code,
+            RoomEventKind.GAME,
+            since_version,
+            on_update,
+            self.get_game if catch_up else None,
+        )
+
+    async def subscribe_to_clip_events(
+        self,
+        room_code: str,
+        on_clip: Callable[[ClipReady], Awaitable[None]],
+    ):
+        async def handler(event: RoomEvent):
+            if event.kind == RoomEventKind.CLIP:
+                await on_clip(event.clip)
+
+        await self._subscribe(self._events_channel(room_code), handler, decode_event)
+
+    async def _subscribe_to_events(
+        self,
+        room_code: str,
+        kind: RoomEventKind,
+        since_version: int,
+        on_update: Callable[[RoomModel | GameModel | None, int], Awaitable[None]],
+        fetch: Callable[[str], Awaitable[RoomModel | GameModel | None]] | None,
     ):
-        self._pubsub = self.redis_client.pubsub()
-        key = f'room:{room_code}:game'
-        self._channel = f'__keyspace@0__:{key}'
-
-        await self._pubsub.subscribe(self._channel)
-        async for message in self._pubsub.listen():
-            if message['type'] == 'message' and message['data'] == 'set':
-                updated_game = await self.get_game(room_code)
-                await on_update(updated_game)
-            if message['type'] == 'message' and message['data'] == 'del':
-                await on_update(None)
+        """
+        Deliver `kind` snapshots newer than `since_version` to `on_update`,
+        along with their version, dropping any that arrive stale or out of
+        order.
+
+        Events published before the subscription is in place are never seen.
+        With `fetch`, the current snapshot is read once subscribed and delivered
+        if it is newer, so a change made between the caller's own read and the
+        subscription is not lost.
+        """
+        latest_version = since_version
+        # The snapshot is delivered from this task and events from the
+        # channel's, so one at a time to keep them in version order
+        lock = asyncio.Lock()
+
+        async def deliver(snapshot: RoomModel | GameModel | None, version: int):
+            nonlocal latest_version
+            async with lock:
+                if version <= latest_version:
+                    return
+                latest_version = version
+                await on_update(snapshot, version)
+
+        async def handler(event: RoomEvent):
+            if event.kind == kind:
+                await deliver(
+                    event.room if kind == RoomEventKind.ROOM else event.game,
+                    event.version,
+                )
+
+        await self._subscribe(self._events_channel(room_code), handler, decode_event)
+        if fetch is not None:
+            snapshot = await fetch(room_code)
+            if snapshot is not None:
+                await deliver(snapshot, snapshot.version)
+
+    async def unsubscribe_all(self):
+        for channel, handler in self._subscriptions:
+            await self.pubsub_hub.unsubscribe(channel, handler)
+        self._subscriptions.clear()
+
+    async def _subscribe(self, channel: str, handler, decode):
+        await self.pubsub_hub.subscribe(channel, handler, decode)
+        self._subscriptions.append((channel, handler))
+
+
+async def decode_event(data: str) -> RoomEvent:
+    return RoomEvent.model_validate_json(data)
@@ -0,0 +1,210 @@
+"""
+Lua scripts that read, mutate, persist and publish room state atomically in a
+single round trip. Each bumps the room's version counter, writes the snapshot
+and publishes a models.events.RoomEvent on the room's events channel.
+
+Common arguments: KEYS[1] is the snapshot key, KEYS[2] the version counter,
+ARGV[1] the events channel and ARGV[2] the TTL in seconds, which every write
+refreshes so abandoned rooms expire. Scripts return the new snapshot JSON, or
+nil when there was nothing to mutate.
+"""
+
+# ARGV[3]: 'room' or 'game', ARGV[4]: snapshot JSON (its version is replaced)
+SAVE_SNAPSHOT = """
+local snapshot = cjson.decode(ARGV[4])
+snapshot.version = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+local encoded = cjson.encode(snapshot)
+redis.call('SET', KEYS[1], encoded, 'EX', ARGV[2])
+redis.call('PUBLISH', ARGV[1], '{"kind":"' .. ARGV[3] .. '","version":'
+    .. snapshot.version .. ',"' .. ARGV[3] .. '":' .. encoded .. '}')
+return encoded
+"""
+
+# ARGV[3]: 'room' or 'game'
+DELETE_SNAPSHOT = """
+if redis.call('DEL', KEYS[1]) == 0 then
+    return nil
+end
+local version = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('PUBLISH', ARGV[1],
+    '{"kind":"' .. ARGV[3] .. '","version":' .. version .. '}')
+return nil
+"""
+
+# ARGV[3]: player id, ARGV[4]: player name
+ADD_PLAYER = """
+local data = redis.call('GET', KEYS[1])
+if not data then
+    return nil
+end
+local room = cjson.decode(data)
+if room.player_names[ARGV[3]] == nil then
+    table.insert(room.player_ids, ARGV[3])
+end
+room.player_names[ARGV[3]] = ARGV[4]
+room.version = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+local encoded = cjson.encode(room)
+redis.call('SET', KEYS[1], encoded, 'EX', ARGV[2])
+redis.call('PUBLISH', ARGV[1],
+    '{"kind":"room","version":' .. room.version .. ',"room":' .. encoded .. '}')
+return encoded
+"""
+
+# ARGV[3]: player id. Deletes the room when its last player leaves, and hands
+# the host role to the next player when the host leaves. A deleted room's code
+# stays allocated until its version counter expires (see RECLAIM_ROOM_CODES),
+# so a new room never inherits the old one's game, round or summary keys.
+REMOVE_PLAYER = """
+local data = redis.call('GET', KEYS[1])
+if not data then
+    return nil
+end
+local room = cjson.decode(data)
+local index = nil
+for i, player_id in ipairs(room.player_ids) do
+    if player_id == ARGV[3] then
+        index = i
+        break
+    end
+end
+if index == nil then
+    return data
+end
+table.remove(room.player_ids, index)
+room.player_names[ARGV[3]] = nil
+local version = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+if #room.player_ids == 0 then
+    redis.call('DEL', KEYS[1])
+    redis.call('PUBLISH', ARGV[1], '{"kind":"room","version":' .. version .. '}')
+    return nil
+end
+if room.host_id == ARGV[3] then
+    room.host_id = room.player_ids[1]
+end
+room.version = version
+local encoded = cjson.encode(room)
+redis.call('SET', KEYS[1], encoded, 'EX', ARGV[2])
+redis.call('PUBLISH', ARGV[1],
+    '{"kind":"room","version":' .. version .. ',"room":' .. encoded .. '}')
+return encoded
+"""
+
+# Unlike the scripts above this neither versions nor publishes anything.
+# KEYS[1]: game snapshot key, KEYS[2]: the room's departed players set,
+# ARGV[1]: player id, ARGV[2]: TTL. While a game is running, records the player
+# for removal when it ends, since removing them would reindex player_ids under
+# the running rounds. Returns 1 if deferred, 0 if no game is running.
+DEFER_PLAYER_REMOVAL = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('SADD', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return 1
+"""
+
+# KEYS[3]: room key, KEYS[4]: previous game's summary key, ARGV[3]: room code,
+# ARGV[4]: prefix of the per-round upload hashes. Refuses to restart a game that
+# is already running. Clears the previous game's uploads for every round this
+# one will play; rounds are numbered 1 to the player count, so those keys are
+# derived here rather than passed in.
+START_GAME = """
+local room_data = redis.call('GET', KEYS[3])
+if not room_data or redis.call('EXISTS', KEYS[1]) == 1 then
+    return nil
+end
+redis.call('DEL', KEYS[4])
+for round = 1, #cjson.decode(room_data).player_ids do
+    redis.call('DEL', ARGV[4] .. round)
+end
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+local version = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+local encoded = cjson.encode({room = ARGV[3], round = 1, version = version})
+redis.call('SET', KEYS[1], encoded, 'EX', ARGV[2])
+redis.call('PUBLISH', ARGV[1],
+    '{"kind":"game","version":' .. version .. ',"game":' .. encoded .. '}')
+return encoded
+"""
+
+# ARGV[3]: the round being ended, or '' to advance unconditionally. Lets
+# competing timers race safely: only the first to end a round advances it.
+NEXT_ROUND = """
+local data = redis.call('GET', KEYS[1])
+if not data then
+    return nil
+end
+local game = cjson.decode(data)
+if ARGV[3] ~= '' and game.round ~= tonumber(ARGV[3]) then
+    return nil
+end
+game.round = game.round + 1
+game.version = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+local encoded = cjson.encode(game)
+redis.call('SET', KEYS[1], encoded, 'EX', ARGV[2])
+redis.call('PUBLISH', ARGV[1],
+    '{"kind":"game","version":' .. game.version .. ',"game":' .. encoded .. '}')
+return encoded
+"""
+
+# Allocates a room code and creates the room in one step. Its keys depend on the
+# code it picks, so unlike the scripts above it derives them itself.
+# KEYS[1]: free room code pool, KEYS[2]: allocated room codes, ARGV[1]: TTL,
+# ARGV[2]: pool low-water mark, ARGV[3]: fallback code used when the pool is
+# low, ARGV[4]: room JSON (its code and version are replaced). Returns nil only
+# if the fallback code is taken.
+CREATE_ROOM = """
+local code = nil
+if redis.call('SCARD', KEYS[1]) > tonumber(ARGV[2]) then
+    -- Skip codes still held by rooms created outside the pool
+    for _ = 1, 8 do
+        local candidate = redis.call('SPOP', KEYS[1])
+        redis.call('SADD', KEYS[2], candidate)
+        if redis.call('EXISTS', 'room:' .. candidate,
+                'room:' .. candidate .. ':version') == 0 then
+            code = candidate
+            break
+        end
+    end
+end
+if code == nil then
+    if redis.call('EXISTS', 'room:' .. ARGV[3],
+            'room:' .. ARGV[3] .. ':version') > 0 then
+        return nil
+    end
+    code = ARGV[3]
+end
+local room_key = 'room:' .. code
+local version_key = room_key .. ':version'
+local room = cjson.decode(ARGV[4])
+room.code = code
+room.version = redis.call('INCR', version_key)
+redis.call('EXPIRE', version_key, ARGV[1])
+local encoded = cjson.encode(room)
+redis.call('SET', room_key, encoded, 'EX', ARGV[1])
+redis.call('PUBLISH', room_key .. ':events',
+    '{"kind":"room","version":' .. room.version .. ',"room":' .. encoded .. '}')
+return encoded
+"""
+
+# KEYS[1]: free room code pool, KEYS[2]: allocated room codes, ARGV: codes to
+# check. Returns codes whose room no longer exists (e.g. it expired) to the pool
+# and the number returned. A code is only free once its version counter has
+# expired too: every key of the room's games expires no later than the counter,
+# which each room and game write refreshes.
+RECLAIM_ROOM_CODES = """
+local reclaimed = 0
+for _, code in ipairs(ARGV) do
+    if redis.call('EXISTS', 'room:' .. code, 'room:' .. code .. ':version') == 0
+        and redis.call('SREM', KEYS[2], code) == 1 then
+        redis.call('SADD', KEYS[1], code)
+        reclaimed = reclaimed + 1
+    end
+end
+return reclaimed
+"""
@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+
+from config import (
+    REVERSAL_BACKEND,
+    REVERSAL_CACHE_DISK,
+    REVERSAL_CACHE_DISK_MAX_BYTES,
+    REVERSAL_CACHE_MAX_BYTES,
+    STORAGE_PATH,
+)
+
+from .reversal_engine import ReversalEngine, get_reversal_engine
+from .reverse_audio import EncodingProfile
+
+
+class ReversalCache:
+    """
+    Content-addressed cache in front of the reversal engine.
+
+    Entries are keyed by a hash of the input bytes plus the formats and backend
+    that produced them. The memory tier is an LRU bounded by total bytes; the
+    optional disk tier keeps one file per key under `disk_path` and evicts the
+    least recently used files once they exceed `disk_max_bytes`. Concurrent
+    requests for the same key share a single reversal job.
+    """
+
+    def __init__(
+        self,
+        engine: ReversalEngine | None = None,
+        max_bytes: int = REVERSAL_CACHE_MAX_BYTES,
+        disk_path: str | None = None,
+        disk_max_bytes: int = REVERSAL_CACHE_DISK_MAX_BYTES,
+        backend: str = REVERSAL_BACKEND,
+    ):
+        self.engine = engine or get_reversal_engine()
+        self.max_bytes = max_bytes
+        self.disk_path = disk_path
+        self.disk_max_bytes = disk_max_bytes
+        self.backend = backend
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._in_flight: dict[str, asyncio.Future[bytes]] = {}
+        # Bytes this worker believes are on disk. Other workers write to the
+        # same directory, so it is refreshed from a scan whenever we prune.
+        self._disk_size: int | None = None
+        self._pruning = False
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if self.disk_path:
+            os.makedirs(self.disk_path, exist_ok=True)
+
+    def key(
+        self,
+        file_bytes: bytes,
+        input_format: str,
+        output_format: str,
+        profile: EncodingProfile | None = None,
+    ) -> str:
+        return self.key_from_digest(
+            hashlib.sha256(file_bytes), input_format, output_format, profile
+        )
+
+    def key_from_digest(
+        self,
+        digest: 'hashlib._Hash',
+        input_format: str,
+        output_format: str,
+        profile: EncodingProfile | None = None,
+    ) -> str:
+        """
+        Build a key from a sha256 of the input that the caller fed incrementally,
+        e.g. while spooling an upload to disk.
+        """
+        digest = digest.copy()
+        digest.update(f'|{input_format}|{output_format}|{self.backend}'.encode())
+        if profile is not None:
+            # Every setting, so changing a profile's definition misses the cache
+            digest.update(f'|{tuple(profile)}'.encode())
+        return digest.hexdigest()
+
+    async def reverse(
+        self,
+        file_bytes: bytes,
+        input_format: str = 'webm',
+        output_format: str = 'webm',
+    ) -> bytes:
+        key = self.key(file_bytes, input_format, output_format)
+        return await self._get_or_compute(
+            key,
+            output_format,
+            lambda: self.engine.reverse(file_bytes, input_format, output_format),
+        )
+
+    async def transcode(
+        self,
+        file_bytes: bytes,
+        profile: EncodingProfile,
+        input_format: str = 'webm',
+        output_format: str = 'webm',
+    ) -> tuple[bytes, bytes, bytes]:
+        """
+        The clip encoded to `profile`, its reversal and its waveform peaks. All
+        three are cached together as one entry.
+        """
+        key = self.key(file_bytes, input_format, output_format, profile)
+
+        async def compute() -> bytes:
+            return _pack(
+                *await self.engine.transcode(
+                    file_bytes, profile, input_format, output_format
+                )
+            )
+
+        packed = await self._get_or_compute(key, f'{output_format}.pair', compute)
+        return _unpack(packed)
+
+    async def reverse_file(
+        self,
+        key: str,
+        input_path: str,
+        output_path: str,
+        input_format: str = 'webm',
+        output_format: str = 'webm',
+    ) -> None:
+        """
+        Write the reversal of the file at input_path to output_path, reversing it
+        in a worker straight from disk on a miss.
+        """
+        computed = False
+
+        async def compute() -> bytes:
+            nonlocal computed
+            await self.engine.reverse_file(
+                input_path, output_path, input_format, output_format
+            )
+            computed = True
+            return await asyncio.to_thread(_read_file, output_path)
+
+        reversed_bytes = await self._get_or_compute(key, output_format, compute)
+        if not computed:
+            await asyncio.to_thread(_write_file, output_path, reversed_bytes)
+
+    async def _get_or_compute(
+        self,
+        key: str,
+        output_format: str,
+        compute: Callable[[], Awaitable[bytes]],
+    ) -> bytes:
+        cached = self._get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            try:
+                reversed_bytes = await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # The caller running the job was cancelled, not us; run it again
+                return await self._get_or_compute(key, output_format, compute)
+            self.hits += 1
+            return reversed_bytes
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            reversed_bytes = await self._read_disk(key, output_format)
+            if reversed_bytes is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                reversed_bytes = await compute()
+                await self._write_disk(key, output_format, reversed_bytes)
+            self._put(key, reversed_bytes)
+            future.set_result(reversed_bytes)
+            return reversed_bytes
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved so it is not logged as lost
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'disk_evictions': self.disk_evictions,
+            'entries': len(self._entries),
+            'bytes': self._size,
+        }
+
+    def _get(self, key: str) -> bytes | None:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        self._entries[key] = value
+        self._size += len(value)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def _disk_file(self, key: str, output_format: str) -> str:
+        return os.path.join(self.disk_path, f'{key}.{output_format}')
+
+    async def _read_disk(self, key: str, output_format: str) -> bytes | None:
+        if not self.disk_path:
+            return None
+        try:
+            return await asyncio.to_thread(
+                _read_touched, self._disk_file(key, output_format)
+            )
+        except FileNotFoundError:
+            return None
+
+    async def _write_disk(self, key: str, output_format: str, value: bytes) -> None:
+        if not self.disk_path:
+            return
+        path = self._disk_file(key, output_format)
+
+        def write() -> None:
+            # Write then rename so readers never see a partial file
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            _write_file(tmp_path, value)
+            os.replace(tmp_path, path)
+
+        await asyncio.to_thread(write)
+        if self._disk_size is None:
+            self._disk_size = await asyncio.to_thread(_dir_size, self.disk_path)
+        else:
+            self._disk_size += len(value)
+        if self._disk_size > self.disk_max_bytes and not self._pruning:
+            self._pruning = True
+            try:
+                self._disk_size, evicted = await asyncio.to_thread(
+                    _prune_dir, self.disk_path, self.disk_max_bytes
+                )
+                self.disk_evictions += evicted
+            finally:
+                self._pruning = False
+
+
+def _pack(*parts: bytes) -> bytes:
+    return b''.join(len(part).to_bytes(8, 'big') + part for part in parts)
+
+
+def _unpack(packed: bytes) -> tuple[bytes, ...]:
+    parts = []
+    offset = 0
+    while offset < len(packed):
+        size = int.from_bytes(packed[offset : offset + 8], 'big')
+        parts.append(packed[offset + 8 : offset + 8 + size])
+        offset += 8 + size
+    return tuple(parts)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _write_file(path: str, value: bytes) -> None:
+    with open(path, 'wb') as f:
+        f.write(value)
+
+
+def _read_touched(path: str) -> bytes:
+    value = _read_file(path)
+    # mtime is the disk tier's recency, so a hit keeps the file around
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return value
+
+
+def _disk_entries(path: str) -> list[tuple[str, os.stat_result]]:
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_file():
+                    entries.append((entry.path, entry.stat()))
+            except FileNotFoundError:
+                pass
+    return entries
+
+
+def _dir_size(path: str) -> int:
+    return sum(stat.st_size for _, stat in _disk_entries(path))
+
+
+def _prune_dir(path: str, max_bytes: int) -> tuple[int, int]:
+    """
+    Delete the least recently used files in `path` until they total at most
+    `max_bytes`. Returns the bytes left and the number of files deleted.
+    """
+    entries = _disk_entries(path)
+    size = sum(stat.st_size for _, stat in entries)
+    evicted = 0
+    for file_path, stat in sorted(entries, key=lambda entry: entry[1].st_mtime):
+        if size <= max_bytes:
+            break
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass  # Another worker pruned it first
+        size -= stat.st_size
+        evicted += 1
+    return size, evicted
+
+
+reversal_cache = ReversalCache(
+    disk_path=os.path.join(STORAGE_PATH, 'reversal_cache')
+    if REVERSAL_CACHE_DISK
+    else None,
+)
+
+
+def get_reversal_cache() -> ReversalCache:
+    return reversal_cache
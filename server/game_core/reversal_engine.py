@@ -0,0 +1,144 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import (
+    METRICS_ENABLED,
+    REVERSAL_BACKEND,
+    REVERSAL_MAX_PENDING,
+    REVERSAL_TIMEOUT,
+    REVERSAL_WORKERS,
+)
+
+from .metrics import REVERSAL_ERRORS, REVERSAL_SECONDS, timer
+from .reverse_audio import (
+    EncodingProfile,
+    reverse_audio,
+    reverse_audio_file,
+    transcode_audio,
+)
+
+
+class ReversalError(Exception):
+    pass
+
+
+class ReversalTimeoutError(ReversalError):
+    pass
+
+
+class ReversalEngine:
+    """
+    Runs `reverse_audio` in a bounded process pool so decoding and re-encoding
+    never block the event loop.
+
+    At most `max_pending` jobs are queued or running at once; further callers
+    wait for a slot. A job that exceeds its timeout (or whose caller is
+    cancelled) is cancelled if it has not started yet; a job that is already
+    running finishes in its worker and its result is discarded.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = REVERSAL_WORKERS,
+        max_pending: int = REVERSAL_MAX_PENDING,
+        timeout: float = REVERSAL_TIMEOUT,
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_pending)
+        self._executor: ProcessPoolExecutor | None = None
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def reverse(
+        self,
+        file_bytes: bytes,
+        input_format: str = 'webm',
+        output_format: str = 'webm',
+        timeout: float | None = None,
+    ) -> bytes:
+        return await self._run(
+            timeout, reverse_audio, file_bytes, input_format, output_format
+        )
+
+    async def transcode(
+        self,
+        file_bytes: bytes,
+        profile: EncodingProfile,
+        input_format: str = 'webm',
+        output_format: str = 'webm',
+        timeout: float | None = None,
+    ) -> tuple[bytes, bytes, bytes]:
+        """
+        Like `reverse`, but also returns the clip re-encoded to `profile`
+        (forwards) and its waveform peaks, all from a single decode.
+        """
+        return await self._run(
+            timeout, transcode_audio, file_bytes, profile, input_format, output_format
+        )
+
+    async def reverse_file(
+        self,
+        input_path: str,
+        output_path: str,
+        input_format: str = 'webm',
+        output_format: str = 'webm',
+        timeout: float | None = None,
+    ) -> None:
+        """
+        Like `reverse`, but the worker reads and writes the given paths so large
+        clips never pass through this process's memory.
+        """
+        await self._run(
+            timeout,
+            reverse_audio_file,
+            input_path,
+            output_path,
+            input_format,
+            output_format,
+        )
+
+    async def _run(self, timeout: float | None, fn, *args):
+        with timer(REVERSAL_SECONDS, REVERSAL_BACKEND):
+            try:
+                return await self._run_in_pool(timeout, fn, *args)
+            except ReversalError:
+                if METRICS_ENABLED:
+                    REVERSAL_ERRORS.labels(REVERSAL_BACKEND).inc()
+                raise
+
+    async def _run_in_pool(self, timeout: float | None, fn, *args):
+        async with self._slots:
+            self.start()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, fn, *args)
+            try:
+                return await asyncio.wait_for(future, timeout or self.timeout)
+            except TimeoutError as e:
+                raise ReversalTimeoutError('Audio reversal timed out') from e
+            except BrokenProcessPool as e:
+                # A worker died (e.g. killed for memory); start a fresh pool for
+                # the next job instead of failing every request from now on.
+                self.shutdown()
+                raise ReversalError('Audio reversal worker crashed') from e
+            except Exception as e:
+                raise ReversalError(f'Audio reversal failed: {e}') from e
+
+
+reversal_engine = ReversalEngine()
+
+
+def get_reversal_engine() -> ReversalEngine:
+    return reversal_engine
@@ -1,19 +1,302 @@
 import io
+from typing import NamedTuple, Protocol
 
+import av
+import numpy as np
 from pydub import AudioSegment
 
+from config import AUDIO_PROFILE, REVERSAL_BACKEND, ROUND_DURATION, WAVEFORM_BUCKETS
+
+
+class EncodingProfile(NamedTuple):
+    """
+    How uploaded clips are re-encoded before they are stored.
+    """
+
+    name: str
+    # Store the upload untouched; only the reversed clip is encoded
+    keep_original: bool = False
+    # Mix down (or up) to this many channels; None keeps the upload's layout
+    channels: int | None = None
+    # Target bitrate in bits per second; None leaves it to the encoder
+    bitrate: int | None = None
+    # Clips are cut to this many seconds
+    max_duration: float | None = None
+    # Points in the waveform envelope computed alongside the encodes
+    waveform_buckets: int = WAVEFORM_BUCKETS
+
+
+PROFILES: dict[str, EncodingProfile] = {
+    profile.name: profile
+    for profile in (
+        EncodingProfile('original', keep_original=True),
+        # Opus is transparent for speech from about 24 kbps mono
+        EncodingProfile(
+            'voice', channels=1, bitrate=24_000, max_duration=ROUND_DURATION
+        ),
+        EncodingProfile(
+            'compact', channels=1, bitrate=12_000, max_duration=ROUND_DURATION
+        ),
+    )
+}
+
+
+def get_profile(name: str = AUDIO_PROFILE) -> EncodingProfile:
+    if name not in PROFILES:
+        raise ValueError(
+            f'Unknown encoding profile {name!r}, expected one of {sorted(PROFILES)}'
+        )
+    return PROFILES[name]
+
+
+class ReversalBackend(Protocol):
+    name: str
+
+    def reverse(
+        self, file_bytes: bytes, input_format: str, output_format: str
+    ) -> bytes: ...
+
+    def transcode(
+        self,
+        file_bytes: bytes,
+        input_format: str,
+        output_format: str,
+        profile: EncodingProfile,
+    ) -> tuple[bytes, bytes, bytes]:
+        """
+        Decode once and encode the clip to `profile` both forwards and reversed,
+        plus the forward clip's waveform peaks (see `waveform_peaks`).
+        """
+        ...
+
+
+def waveform_peaks(pcm: np.ndarray, buckets: int) -> bytes:
+    """
+    Peak amplitude of each of `buckets` equal slices of float PCM shaped
+    (samples, channels), as one byte per slice scaled to 0-255 of full scale.
+    """
+    if len(pcm) < buckets:
+        pcm = np.pad(pcm, ((0, buckets - len(pcm)), (0, 0)))
+    # Reduce the interleaved samples in one pass; a max over the short channel
+    # axis first is far slower
+    starts = np.arange(buckets) * len(pcm) // buckets * pcm.shape[1]
+    peaks = np.maximum.reduceat(np.abs(pcm.reshape(-1)), starts)
+    return np.rint(np.clip(peaks, 0.0, 1.0) * 255).astype(np.uint8).tobytes()
+
+
+class PydubBackend:
+    """
+    Decodes and re-encodes through pydub, which forks ffmpeg for each direction
+    and reverses the raw PCM in Python.
+    """
+
+    name = 'pydub'
+
+    def reverse(
+        self, file_bytes: bytes, input_format: str, output_format: str
+    ) -> bytes:
+        audio = AudioSegment.from_file(
+            io.BytesIO(file_bytes), format=input_format, codec='opus'
+        )
+        return self._export(audio.reverse(), output_format)
+
+    def transcode(
+        self,
+        file_bytes: bytes,
+        input_format: str,
+        output_format: str,
+        profile: EncodingProfile,
+    ) -> tuple[bytes, bytes, bytes]:
+        audio = AudioSegment.from_file(
+            io.BytesIO(file_bytes), format=input_format, codec='opus'
+        )
+        if profile.keep_original:
+            return (
+                file_bytes,
+                self._export(audio.reverse(), output_format),
+                self._peaks(audio, profile.waveform_buckets),
+            )
+        if profile.max_duration is not None:
+            audio = audio[: int(profile.max_duration * 1000)]
+        if profile.channels is not None:
+            audio = audio.set_channels(profile.channels)
+        bitrate = f'{profile.bitrate // 1000}k' if profile.bitrate else None
+        return (
+            self._export(audio, output_format, bitrate),
+            self._export(audio.reverse(), output_format, bitrate),
+            self._peaks(audio, profile.waveform_buckets),
+        )
+
+    @staticmethod
+    def _peaks(audio: AudioSegment, buckets: int) -> bytes:
+        full_scale = float(1 << (8 * audio.sample_width - 1))
+        pcm = np.array(audio.get_array_of_samples(), dtype=np.float32)
+        return waveform_peaks(pcm.reshape(-1, audio.channels) / full_scale, buckets)
+
+    @staticmethod
+    def _export(
+        audio: AudioSegment, output_format: str, bitrate: str | None = None
+    ) -> bytes:
+        output_io = io.BytesIO()
+        audio.export(output_io, format=output_format, bitrate=bitrate)
+        output_io.seek(0)
+        return output_io.read()
+
+
+class PyAVBackend:
+    """
+    Decodes and re-encodes in-process with PyAV (libav bindings) and reverses the
+    PCM as a NumPy array, so no subprocess is spawned and no WAV is piped around.
+    """
+
+    name = 'pyav'
+
+    # Opus only supports a few sample rates; 48 kHz is what browsers record at.
+    SAMPLE_RATE = 48000
+    LAYOUTS = {1: 'mono', 2: 'stereo'}
+    CODECS = {
+        'webm': 'libopus',
+        'ogg': 'libopus',
+        'mp3': 'libmp3lame',
+        'wav': 'pcm_s16le',
+    }
+
+    def decode(self, file_bytes: bytes, input_format: str) -> tuple[np.ndarray, str]:
+        """
+        Decode to packed float32 PCM of shape (samples, channels) at SAMPLE_RATE.
+        """
+        with av.open(io.BytesIO(file_bytes), format=input_format) as container:
+            stream = container.streams.audio[0]
+            layout = stream.layout.name
+            resampler = av.AudioResampler(
+                format='flt', layout=layout, rate=self.SAMPLE_RATE
+            )
+            chunks = []
+            for frame in container.decode(stream):
+                for resampled in resampler.resample(frame):
+                    chunks.append(resampled.to_ndarray())
+            for resampled in resampler.resample(None):
+                chunks.append(resampled.to_ndarray())
+
+        channels = len(av.AudioLayout(layout).channels)
+        if not chunks:
+            return np.zeros((0, channels), dtype=np.float32), layout
+        pcm = np.concatenate(chunks, axis=1).reshape(-1, channels)
+        return pcm, layout
+
+    def encode(
+        self,
+        pcm: np.ndarray,
+        layout: str,
+        output_format: str,
+        bitrate: int | None = None,
+    ) -> bytes:
+        output_io = io.BytesIO()
+        with av.open(output_io, mode='w', format=output_format) as container:
+            stream = container.add_stream(
+                self.CODECS.get(output_format, 'libopus'), rate=self.SAMPLE_RATE
+            )
+            stream.layout = layout
+            if bitrate is not None:
+                stream.bit_rate = bitrate
+            if len(pcm):
+                frame = av.AudioFrame.from_ndarray(
+                    np.ascontiguousarray(pcm).reshape(1, -1),
+                    format='flt',
+                    layout=layout,
+                )
+                frame.sample_rate = self.SAMPLE_RATE
+                container.mux(stream.encode(frame))
+            container.mux(stream.encode(None))
+        return output_io.getvalue()
+
+    def reverse(
+        self, file_bytes: bytes, input_format: str, output_format: str
+    ) -> bytes:
+        pcm, layout = self.decode(file_bytes, input_format)
+        return self.encode(pcm[::-1], layout, output_format)
+
+    def transcode(
+        self,
+        file_bytes: bytes,
+        input_format: str,
+        output_format: str,
+        profile: EncodingProfile,
+    ) -> tuple[bytes, bytes, bytes]:
+        pcm, layout = self.decode(file_bytes, input_format)
+        if profile.keep_original:
+            return (
+                file_bytes,
+                self.encode(pcm[::-1], layout, output_format),
+                waveform_peaks(pcm, profile.waveform_buckets),
+            )
+        if profile.max_duration is not None:
+            pcm = pcm[: int(profile.max_duration * self.SAMPLE_RATE)]
+        if profile.channels is not None and profile.channels != pcm.shape[1]:
+            mono = pcm.mean(axis=1, keepdims=True)
+            pcm = np.repeat(mono, profile.channels, axis=1)
+            layout = self.LAYOUTS[profile.channels]
+        return (
+            self.encode(pcm, layout, output_format, profile.bitrate),
+            self.encode(pcm[::-1], layout, output_format, profile.bitrate),
+            waveform_peaks(pcm, profile.waveform_buckets),
+        )
+
+
+BACKENDS: dict[str, type[ReversalBackend]] = {
+    PydubBackend.name: PydubBackend,
+    PyAVBackend.name: PyAVBackend,
+}
+
+
+def get_backend(name: str = REVERSAL_BACKEND) -> ReversalBackend:
+    if name not in BACKENDS:
+        raise ValueError(
+            f'Unknown reversal backend {name!r}, expected one of {sorted(BACKENDS)}'
+        )
+    return BACKENDS[name]()
+
 
 def reverse_audio(
-    file_bytes: bytes, input_format: str = 'webm', output_format: str = 'webm'
+    file_bytes: bytes,
+    input_format: str = 'webm',
+    output_format: str = 'webm',
+    backend: str = REVERSAL_BACKEND,
 ) -> bytes:
     """
     Reverse the audio from the given bytes and return the reversed audio as bytes.
     """
-    audio = AudioSegment.from_file(
-        io.BytesIO(file_bytes), format=input_format, codec='opus'
+    return get_backend(backend).reverse(file_bytes, input_format, output_format)
+
+
+def transcode_audio(
+    file_bytes: bytes,
+    profile: EncodingProfile,
+    input_format: str = 'webm',
+    output_format: str = 'webm',
+    backend: str = REVERSAL_BACKEND,
+) -> tuple[bytes, bytes, bytes]:
+    """
+    Encode the audio to `profile`, returning it forwards and reversed, and its
+    waveform peaks.
+    """
+    return get_backend(backend).transcode(
+        file_bytes, input_format, output_format, profile
     )
-    reversed_audio = audio.reverse()
-    output_io = io.BytesIO()
-    reversed_audio.export(output_io, format=output_format)
-    output_io.seek(0)
-    return output_io.read()
+
+
+def reverse_audio_file(
+    input_path: str,
+    output_path: str,
+    input_format: str = 'webm',
+    output_format: str = 'webm',
+    backend: str = REVERSAL_BACKEND,
+) -> None:
+    """
+    Reverse the audio file at input_path and write the result to output_path.
+    """
+    with open(input_path, 'rb') as f:
+        file_bytes = f.read()
+    reversed_bytes = reverse_audio(file_bytes, input_format, output_format, backend)
+    with open(output_path, 'wb') as f:
+        f.write(reversed_bytes)
@@ -0,0 +1,125 @@
+import asyncio
+import itertools
+import logging
+import secrets
+import string
+
+from clients.redis_client import get_redis_client
+from config import ROOM_CODE_LENGTH, ROOM_CODE_RECLAIM_INTERVAL
+
+from . import redis_scripts
+
+logger = logging.getLogger(__name__)
+
+FREE_CODES_KEY = 'room_codes:free'
+ALLOCATED_CODES_KEY = 'room_codes:allocated'
+SEEDED_KEY = 'room_codes:seeded'
+SEED_LOCK_KEY = 'room_codes:seed:lock'
+RECLAIM_LOCK_KEY = 'room_codes:reclaim:lock'
+
+SEED_BATCH = 10_000
+# Long enough to seed every 4-letter code; a worker that dies mid-seed only
+# holds up the others until it expires
+SEED_LOCK_TTL = 60
+RECLAIM_BATCH = 500
+
+ROOM_CODE_ALPHABET = string.ascii_uppercase
+
+
+def random_room_code(length: int) -> str:
+    return ''.join(secrets.choice(ROOM_CODE_ALPHABET) for _ in range(length))
+
+
+class RoomCodePool:
+    """
+    Keeps the Redis set of free room codes that RedisManager.create_room pops
+    from. The pool is seeded once with every ROOM_CODE_LENGTH-letter code.
+    Codes of rooms that were deleted or expired are reclaimed periodically,
+    once nothing of the room is left in Redis.
+    """
+
+    def __init__(self, code_length: int = ROOM_CODE_LENGTH):
+        self.redis_client = get_redis_client()
+        self.code_length = code_length
+        self._reclaim = self.redis_client.register_script(
+            redis_scripts.RECLAIM_ROOM_CODES
+        )
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # Retried every pass in case a worker died while seeding
+                await self.seed()
+            except Exception:
+                logger.exception('Seeding room codes failed')
+            try:
+                if await self.redis_client.set(
+                    RECLAIM_LOCK_KEY, 1, nx=True, ex=ROOM_CODE_RECLAIM_INTERVAL
+                ):
+                    await self.reclaim()
+            except Exception:
+                logger.exception('Reclaiming room codes failed')
+            await asyncio.sleep(ROOM_CODE_RECLAIM_INTERVAL)
+
+    async def seed(self) -> bool:
+        """
+        Fill the pool with every code, once per Redis instance. Until this
+        finishes create_room falls back to longer random codes.
+
+        SEEDED_KEY is only set once every code has been added, so a seed cut
+        short is redone in full by the next worker to take the lock. Adding a
+        code that is already in use is harmless: create_room skips codes whose
+        room still exists.
+        """
+        if await self.redis_client.exists(SEEDED_KEY):
+            return False
+        if not await self.redis_client.set(SEED_LOCK_KEY, 1, nx=True, ex=SEED_LOCK_TTL):
+            return False
+        codes = (
+            ''.join(letters)
+            for letters in itertools.product(
+                ROOM_CODE_ALPHABET, repeat=self.code_length
+            )
+        )
+        while batch := list(itertools.islice(codes, SEED_BATCH)):
+            await self.redis_client.sadd(FREE_CODES_KEY, *batch)
+        await self.redis_client.set(SEEDED_KEY, 1)
+        await self.redis_client.delete(SEED_LOCK_KEY)
+        return True
+
+    async def reclaim(self) -> int:
+        """
+        Return codes of rooms that no longer exist to the pool.
+        """
+        reclaimed = 0
+        cursor = 0
+        while True:
+            cursor, codes = await self.redis_client.sscan(
+                ALLOCATED_CODES_KEY, cursor, count=RECLAIM_BATCH
+            )
+            if codes:
+                reclaimed += await self._reclaim(
+                    keys=[FREE_CODES_KEY, ALLOCATED_CODES_KEY], args=codes
+                )
+            if cursor == 0:
+                return reclaimed
+
+    async def free_count(self) -> int:
+        return await self.redis_client.scard(FREE_CODES_KEY)
+
+
+room_code_pool = RoomCodePool()
+
+
+def get_room_code_pool() -> RoomCodePool:
+    return room_code_pool
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+
+from clients.redis_client import get_redis_client
+from config import ROUND_DURATION
+
+from .redis_manager import RedisManager
+
+logger = logging.getLogger(__name__)
+
+# Sorted set of '{room_code}:{round}' members scored by deadline (unix seconds)
+DEADLINES_KEY = 'rounds:deadlines'
+
+SCHEDULER_TICK = 0.1  # seconds
+# How often each worker pulls due deadlines from Redis, and how far ahead
+SCHEDULER_SWEEP_INTERVAL = 1.0  # seconds
+SCHEDULER_SWEEP_BATCH = 1000
+
+# Remove a deadline only if it is still due, so exactly one worker handles it
+CLAIM_SCRIPT = """
+local deadline = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if deadline and tonumber(deadline) <= tonumber(ARGV[2]) then
+    return redis.call('ZREM', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel. Scheduling and cancelling are O(1) and each tick only
+    looks at one slot, so a single loop can track thousands of deadlines.
+    Deadlines more than one revolution away stay in their slot until their
+    tick comes round.
+    """
+
+    def __init__(self, tick: float = SCHEDULER_TICK, size: int = 1024):
+        self.tick = tick
+        self.slots: list[dict[str, int]] = [{} for _ in range(size)]
+        self._slot_of: dict[str, int] = {}
+        self._current_tick = int(time.time() / tick)
+
+    def schedule(self, key: str, deadline: float) -> None:
+        self.cancel(key)
+        target_tick = max(int(deadline / self.tick), self._current_tick)
+        slot = target_tick % len(self.slots)
+        self.slots[slot][key] = target_tick
+        self._slot_of[key] = slot
+
+    def cancel(self, key: str) -> None:
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            del self.slots[slot][key]
+
+    def advance(self, now: float) -> list[str]:
+        """
+        Move the wheel up to `now` and return the keys that became due.
+        """
+        due = []
+        now_tick = int(now / self.tick)
+        # After a long stall one revolution visits every slot
+        last_tick = min(now_tick, self._current_tick + len(self.slots) - 1)
+        for tick in range(self._current_tick, last_tick + 1):
+            slot = self.slots[tick % len(self.slots)]
+            for key in [k for k, target in slot.items() if target <= now_tick]:
+                del slot[key]
+                del self._slot_of[key]
+                due.append(key)
+        self._current_tick = now_tick + 1
+        return due
+
+
+class RoundScheduler:
+    """
+    Server-authoritative round timing for every room.
+
+    Deadlines live in a Redis sorted set, so any worker can pick up rooms
+    whose host disconnected or whose worker restarted. Each worker feeds the
+    deadlines due within the next sweep into a local timing wheel, and whoever
+    claims a due deadline first ends that round.
+    """
+
+    def __init__(self):
+        self.redis_client = get_redis_client()
+        self.redis_manager = RedisManager()
+        self.wheel = TimingWheel()
+        self._claim = self.redis_client.register_script(CLAIM_SCRIPT)
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def _member(room_code: str, round_number: int) -> str:
+        return f'{room_code}:{round_number}'
+
+    async def schedule_round(
+        self, room_code: str, round_number: int, duration: float = ROUND_DURATION
+    ) -> None:
+        member = self._member(room_code, round_number)
+        deadline = time.time() + duration
+        await self.redis_client.zadd(DEADLINES_KEY, {member: deadline})
+        self.wheel.schedule(member, deadline)
+
+    async def end_round_early(self, room_code: str, round_number: int) -> None:
+        """
+        End a round now, e.g. once every player has uploaded. Does nothing if
+        the round is not the one currently scheduled.
+        """
+        member = self._member(room_code, round_number)
+        now = time.time()
+        # XX: never resurrect a finished round; LT: only ever move it earlier
+        if await self.redis_client.zadd(
+            DEADLINES_KEY, {member: now}, xx=True, lt=True, ch=True
+        ):
+            self.wheel.schedule(member, now)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        next_sweep = 0.0
+        while True:
+            now = time.time()
+            try:
+                if now >= next_sweep:
+                    await self._sweep(now)
+                    next_sweep = now + SCHEDULER_SWEEP_INTERVAL
+            except Exception:
+                logger.exception('Round scheduler sweep failed')
+            for member in self.wheel.advance(now):
+                asyncio.create_task(self._fire(member, now))
+            await asyncio.sleep(self.wheel.tick)
+
+    async def _sweep(self, now: float):
+        deadlines = await self.redis_client.zrangebyscore(
+            DEADLINES_KEY,
+            '-inf',
+            now + SCHEDULER_SWEEP_INTERVAL,
+            start=0,
+            num=SCHEDULER_SWEEP_BATCH,
+            withscores=True,
+        )
+        for member, deadline in deadlines:
+            self.wheel.schedule(member, deadline)
+
+    async def _fire(self, member: str, now: float):
+        try:
+            if not await self._claim(keys=[DEADLINES_KEY], args=[member, now]):
+                return
+            room_code, round_number = member.rsplit(':', 1)
+            await self.end_round(room_code, int(round_number))
+        except Exception:
+            logger.exception('Failed to end round %s', member)
+
+    async def end_round(self, room_code: str, round_number: int):
+        game = await self.redis_manager.get_game(room_code)
+        if game is None or game.round != round_number:
+            return
+        room = await self.redis_manager.get_room(room_code)
+        if room is not None and round_number < len(room.player_ids):
+            game = await self.redis_manager.next_round(
+                room_code, expected_round=round_number
+            )
+            if game is not None:
+                await self.schedule_round(room_code, game.round)
+        else:
+            await self.redis_manager.end_game(room_code)
+
+
+round_scheduler = RoundScheduler()
+
+
+def get_round_scheduler() -> RoundScheduler:
+    return round_scheduler
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import secrets
+import time
+
+from clients.redis_client import get_redis_client
+from config import ROOM_TTL, SESSION_GRACE_PERIOD
+from models.session import SessionModel
+from models.types import PlayerId, RoomId, SessionToken
+
+from .redis_manager import RedisManager
+
+logger = logging.getLogger(__name__)
+
+# Sorted set of '{token}:{connection id}' members scored by the end of their
+# grace period (unix seconds)
+EXPIRIES_KEY = 'sessions:expiries'
+
+# How often each worker ends sessions whose grace period is over
+EXPIRY_SWEEP_INTERVAL = 1.0  # seconds
+EXPIRY_SWEEP_BATCH = 500
+
+# KEYS[1]: session, KEYS[2]: its detached marker, KEYS[3]: expiries,
+# ARGV[1]: connection id, ARGV[2]: marker TTL, ARGV[3]: grace period deadline,
+# ARGV[4]: expiries member. Only the connection the session is attached to can
+# detach it, so a stale socket closing late can't evict a resumed player.
+DETACH_SCRIPT = """
+local data = redis.call('GET', KEYS[1])
+if not data or cjson.decode(data).connection_id ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[2])
+redis.call('ZADD', KEYS[3], ARGV[3], ARGV[4])
+return 1
+"""
+
+# KEYS[1]: session, KEYS[2]: its detached marker, KEYS[3]: expiries,
+# ARGV[1]: new connection id, ARGV[2]: session TTL, ARGV[3]: token. Returns the
+# session JSON, or nil if it has expired.
+ATTACH_SCRIPT = """
+local data = redis.call('GET', KEYS[1])
+if not data then
+    return nil
+end
+local detached = redis.call('GET', KEYS[2])
+if detached then
+    redis.call('ZREM', KEYS[3], ARGV[3] .. ':' .. detached)
+    redis.call('DEL', KEYS[2])
+end
+local session = cjson.decode(data)
+session.connection_id = ARGV[1]
+local encoded = cjson.encode(session)
+redis.call('SET', KEYS[1], encoded, 'EX', ARGV[2])
+return encoded
+"""
+
+# KEYS[1]: session, KEYS[2]: its detached marker, KEYS[3]: expiries,
+# ARGV[1]: connection id, ARGV[2]: expiries member. Claims the expiry, so only
+# one worker handles it, and ends the session if that connection detached it
+# and nobody resumed since. Returns the ended session's JSON.
+EXPIRE_SCRIPT = """
+if redis.call('ZREM', KEYS[3], ARGV[2]) == 0 then
+    return nil
+end
+if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+    return nil
+end
+local data = redis.call('GET', KEYS[1])
+redis.call('DEL', KEYS[1], KEYS[2])
+return data
+"""
+
+
+class SessionManager:
+    """
+    Resumable player sessions. A token is issued when a player creates or
+    joins a room. When their connection drops, the session is detached and
+    the player keeps their seat for SESSION_GRACE_PERIOD seconds; a new
+    connection presenting the token within that window takes it over.
+
+    Grace period deadlines live in a Redis sorted set that every worker
+    sweeps, so a session is still expired if its worker restarts or it is
+    resumed on another worker and dropped again.
+    """
+
+    def __init__(self, grace_period: float = SESSION_GRACE_PERIOD):
+        self.redis_client = get_redis_client()
+        self.redis_manager = RedisManager()
+        self.grace_period = grace_period
+        self._detach = self.redis_client.register_script(DETACH_SCRIPT)
+        self._attach = self.redis_client.register_script(ATTACH_SCRIPT)
+        self._expire = self.redis_client.register_script(EXPIRE_SCRIPT)
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def _keys(token: SessionToken) -> list[str]:
+        return [f'session:{token}', f'session:{token}:detached', EXPIRIES_KEY]
+
+    @staticmethod
+    def _member(token: SessionToken, connection_id: str) -> str:
+        return f'{token}:{connection_id}'
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def create(
+        self, player_id: PlayerId, room_code: RoomId, connection_id: str
+    ) -> SessionToken:
+        token = secrets.token_urlsafe(24)
+        session = SessionModel(
+            player_id=player_id, room_code=room_code, connection_id=connection_id
+        )
+        await self.redis_client.set(
+            f'session:{token}', session.model_dump_json(), ex=ROOM_TTL
+        )
+        return token
+
+    async def attach(
+        self, token: SessionToken, connection_id: str
+    ) -> SessionModel | None:
+        session_data = await self._attach(
+            keys=self._keys(token), args=[connection_id, ROOM_TTL, token]
+        )
+        if not session_data:
+            return None
+        return SessionModel.model_validate_json(session_data)
+
+    async def detach(self, token: SessionToken, connection_id: str) -> None:
+        """
+        Start the grace period for a dropped connection. If it is not resumed
+        in time, the player is removed from their room, once any running game
+        has ended.
+        """
+        await self._detach(
+            keys=self._keys(token),
+            args=[
+                connection_id,
+                int(self.grace_period) + 60,
+                time.time() + self.grace_period,
+                self._member(token, connection_id),
+            ],
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                await self.expire_due()
+            except Exception:
+                logger.exception('Session expiry sweep failed')
+            await asyncio.sleep(EXPIRY_SWEEP_INTERVAL)
+
+    async def expire_due(self) -> int:
+        """
+        End the sessions whose grace period is over and remove their players.
+        Returns how many this worker ended.
+        """
+        members = await self.redis_client.zrangebyscore(
+            EXPIRIES_KEY, '-inf', time.time(), start=0, num=EXPIRY_SWEEP_BATCH
+        )
+        expired = 0
+        for member in members:
+            token, connection_id = member.rsplit(':', 1)
+            try:
+                session_data = await self._expire(
+                    keys=self._keys(token), args=[connection_id, member]
+                )
+                if not session_data:
+                    continue
+                session = SessionModel.model_validate_json(session_data)
+                await self.redis_manager.remove_player_after_game(
+                    session.room_code, session.player_id
+                )
+                expired += 1
+            except Exception:
+                logger.exception('Failed to expire session')
+        return expired
+
+    async def delete(self, token: SessionToken) -> None:
+        session_key, detached_key, _ = self._keys(token)
+        await self.redis_client.delete(session_key, detached_key)
+
+
+session_manager = SessionManager()
+
+
+def get_session_manager() -> SessionManager:
+    return session_manager
@@ -0,0 +1,328 @@
+import asyncio
+import os
+import re
+import shutil
+from collections.abc import AsyncIterator
+from typing import NamedTuple, Protocol
+
+from botocore.exceptions import ClientError
+
+from clients.s3_client import get_s3_client
+from config import (
+    S3_BUCKET,
+    S3_MAX_CONNECTIONS,
+    S3_MULTIPART_PART_SIZE,
+    S3_MULTIPART_THRESHOLD,
+    STORAGE_BACKEND,
+    STORAGE_MAX_CONCURRENCY,
+    STORAGE_PATH,
+)
+from models.types import FileKey
+
+# File keys are bare file names, whichever backend stores them
+FILE_KEY_PATTERN = re.compile(r'^[A-Za-z0-9_-]+\.webm$')
+
+
+def validate_file_key(file_key: FileKey) -> FileKey:
+    if not FILE_KEY_PATTERN.match(file_key):
+        raise ValueError(f'Invalid file key {file_key!r}')
+    return file_key
+
+
+class StorageFullError(Exception):
+    """
+    Raised instead of writing when the storage is nearly full.
+    """
+
+
+class StoredFile(NamedTuple):
+    file_key: FileKey
+    size: int
+    modified: float  # unix seconds
+
+
+class Storage(Protocol):
+    name: str
+
+    async def read(self, file_key: FileKey) -> bytes:
+        """
+        Raises FileNotFoundError if the file does not exist.
+        """
+        ...
+
+    async def read_many(self, file_keys: list[FileKey]) -> list[bytes]: ...
+
+    async def write(self, file_key: FileKey, data: bytes) -> None: ...
+
+    async def delete(self, file_key: FileKey) -> None: ...
+
+    async def delete_many(self, file_keys: list[FileKey]) -> None: ...
+
+    def list_files(self) -> AsyncIterator[StoredFile]: ...
+
+    async def free_bytes(self) -> int | None:
+        """
+        Space left for new files, or None if the backend is not bounded.
+        """
+        ...
+
+    async def download_url(self, file_key: FileKey, expires_in: int) -> str | None:
+        """
+        A URL clients can download the file from directly, or None if it has
+        to be served by this app.
+        """
+        ...
+
+
+class LocalStorage:
+    """
+    Files in a directory on this machine's disk. All disk access runs in the
+    default thread pool so it never blocks the event loop.
+    """
+
+    name = 'local'
+
+    def __init__(
+        self, root: str = STORAGE_PATH, max_concurrency: int = STORAGE_MAX_CONCURRENCY
+    ):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+        self.max_concurrency = max_concurrency
+
+    def path(self, file_key: FileKey) -> str:
+        return os.path.join(self.root, validate_file_key(file_key))
+
+    async def read(self, file_key: FileKey) -> bytes:
+        return await asyncio.to_thread(_read_file, self.path(file_key))
+
+    async def read_many(self, file_keys: list[FileKey]) -> list[bytes]:
+        # Split the keys across at most max_concurrency threads, each reading its
+        # share in one go, rather than paying a thread handoff per file
+        paths = [self.path(file_key) for file_key in file_keys]
+        batch_count = min(self.max_concurrency, len(paths))
+        if batch_count == 0:
+            return []
+        batches = await asyncio.gather(
+            *(
+                asyncio.to_thread(_read_files, paths[i::batch_count])
+                for i in range(batch_count)
+            )
+        )
+        contents = [b''] * len(paths)
+        for i, batch in enumerate(batches):
+            contents[i::batch_count] = batch
+        return contents
+
+    async def write(self, file_key: FileKey, data: bytes) -> None:
+        await asyncio.to_thread(_write_file, self.path(file_key), data)
+
+    async def delete(self, file_key: FileKey) -> None:
+        await asyncio.to_thread(_remove_files, [self.path(file_key)])
+
+    async def delete_many(self, file_keys: list[FileKey]) -> None:
+        paths = [self.path(file_key) for file_key in file_keys]
+        await asyncio.to_thread(_remove_files, paths)
+
+    async def list_files(self) -> AsyncIterator[StoredFile]:
+        for stored_file in await asyncio.to_thread(self._scan):
+            yield stored_file
+
+    def _scan(self) -> list[StoredFile]:
+        files = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not FILE_KEY_PATTERN.match(entry.name):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.is_file():
+                    files.append(StoredFile(entry.name, stat.st_size, stat.st_mtime))
+        return files
+
+    async def free_bytes(self) -> int | None:
+        usage = await asyncio.to_thread(shutil.disk_usage, self.root)
+        return usage.free
+
+    async def download_url(self, file_key: FileKey, expires_in: int) -> str | None:
+        return None
+
+
+class S3Storage:
+    """
+    Objects in an S3-compatible bucket, through the shared pooled client.
+    Large uploads are split into parts sent concurrently, and reads of many
+    files run concurrently up to the size of the connection pool.
+    """
+
+    name = 's3'
+    CONTENT_TYPE = 'audio/webm'
+
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET,
+        max_concurrency: int = S3_MAX_CONNECTIONS,
+        multipart_threshold: int = S3_MULTIPART_THRESHOLD,
+        part_size: int = S3_MULTIPART_PART_SIZE,
+    ):
+        self.bucket = bucket
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def read(self, file_key: FileKey) -> bytes:
+        client = await get_s3_client()
+        async with self._semaphore:
+            try:
+                response = await client.get_object(
+                    Bucket=self.bucket, Key=validate_file_key(file_key)
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                    raise FileNotFoundError(file_key) from e
+                raise
+            async with response['Body'] as body:
+                return await body.read()
+
+    async def read_many(self, file_keys: list[FileKey]) -> list[bytes]:
+        return await asyncio.gather(*(self.read(key) for key in file_keys))
+
+    async def write(self, file_key: FileKey, data: bytes) -> None:
+        validate_file_key(file_key)
+        if len(data) > self.multipart_threshold:
+            await self._write_multipart(file_key, data)
+            return
+        client = await get_s3_client()
+        async with self._semaphore:
+            await client.put_object(
+                Bucket=self.bucket,
+                Key=file_key,
+                Body=data,
+                ContentType=self.CONTENT_TYPE,
+            )
+
+    async def _write_multipart(self, file_key: FileKey, data: bytes) -> None:
+        client = await get_s3_client()
+        upload = await client.create_multipart_upload(
+            Bucket=self.bucket, Key=file_key, ContentType=self.CONTENT_TYPE
+        )
+        upload_id = upload['UploadId']
+
+        async def upload_part(part_number: int, offset: int) -> dict:
+            async with self._semaphore:
+                part = await client.upload_part(
+                    Bucket=self.bucket,
+                    Key=file_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=data[offset : offset + self.part_size],
+                )
+            return {'PartNumber': part_number, 'ETag': part['ETag']}
+
+        try:
+            parts = await asyncio.gather(
+                *(
+                    upload_part(i + 1, offset)
+                    for i, offset in enumerate(range(0, len(data), self.part_size))
+                )
+            )
+            await client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=file_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts},
+            )
+        except BaseException:
+            # Don't leave billed, invisible parts behind
+            await client.abort_multipart_upload(
+                Bucket=self.bucket, Key=file_key, UploadId=upload_id
+            )
+            raise
+
+    async def delete(self, file_key: FileKey) -> None:
+        client = await get_s3_client()
+        async with self._semaphore:
+            await client.delete_object(
+                Bucket=self.bucket, Key=validate_file_key(file_key)
+            )
+
+    async def delete_many(self, file_keys: list[FileKey]) -> None:
+        client = await get_s3_client()
+        # DeleteObjects takes at most 1000 keys per request
+        for i in range(0, len(file_keys), 1000):
+            async with self._semaphore:
+                await client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={
+                        'Objects': [
+                            {'Key': validate_file_key(file_key)}
+                            for file_key in file_keys[i : i + 1000]
+                        ],
+                        'Quiet': True,
+                    },
+                )
+
+    async def list_files(self) -> AsyncIterator[StoredFile]:
+        client = await get_s3_client()
+        paginator = client.get_paginator('list_objects_v2')
+        async for page in paginator.paginate(Bucket=self.bucket):
+            for item in page.get('Contents', []):
+                if FILE_KEY_PATTERN.match(item['Key']):
+                    yield StoredFile(
+                        item['Key'], item['Size'], item['LastModified'].timestamp()
+                    )
+
+    async def free_bytes(self) -> int | None:
+        return None
+
+    async def download_url(self, file_key: FileKey, expires_in: int) -> str | None:
+        client = await get_s3_client()
+        return await client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': validate_file_key(file_key)},
+            ExpiresIn=max(1, expires_in),
+        )
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _read_files(paths: list[str]) -> list[bytes]:
+    return [_read_file(path) for path in paths]
+
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _remove_files(paths: list[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+BACKENDS: dict[str, type[Storage]] = {
+    LocalStorage.name: LocalStorage,
+    S3Storage.name: S3Storage,
+}
+
+
+def create_storage(name: str = STORAGE_BACKEND) -> Storage:
+    if name not in BACKENDS:
+        raise ValueError(
+            f'Unknown storage backend {name!r}, expected one of {sorted(BACKENDS)}'
+        )
+    return BACKENDS[name]()
+
+
+storage = create_storage()
+
+
+def get_storage() -> Storage:
+    return storage
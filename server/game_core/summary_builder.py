@@ -0,0 +1,105 @@
+import asyncio
+from uuid import uuid4
+
+from pydantic import TypeAdapter
+
+from clients.redis_client import get_redis_client
+from models.room import RoomModel
+from models.types import GameFiles
+
+from .file_manager import FileManager
+
+SUMMARY_TTL = 60 * 60  # seconds
+SUMMARY_LOCK_TIMEOUT = 10  # seconds
+SUMMARY_POLL_INTERVAL = 0.05  # seconds
+
+# Delete the lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+game_files_adapter = TypeAdapter(GameFiles)
+
+
+class SummaryBuilder:
+    """
+    Builds each game's file summary once per room.
+
+    Connections on this worker asking for the same room share one in-flight
+    build. Across workers a Redis lock elects a single builder, which persists
+    the result under `game:{room}:summary` for everyone else to read.
+    """
+
+    def __init__(self):
+        self.redis_client = get_redis_client()
+        self.file_manager = FileManager()
+        self._release_lock = self.redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self._in_flight: dict[str, asyncio.Future[GameFiles]] = {}
+
+    @staticmethod
+    def summary_key(room_code: str) -> str:
+        return f'game:{room_code}:summary'
+
+    async def get_summary(self, room: RoomModel) -> GameFiles:
+        in_flight = self._in_flight.get(room.code)
+        if in_flight is not None:
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # The connection building it was cancelled, not us; build again
+                return await self.get_summary(room)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[room.code] = future
+        try:
+            files = await self._build_or_wait(room)
+            future.set_result(files)
+            return files
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved so it is not logged as lost
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[room.code]
+
+    async def _build_or_wait(self, room: RoomModel) -> GameFiles:
+        summary_key = self.summary_key(room.code)
+        lock_key = f'{summary_key}:lock'
+        token = uuid4().hex
+        while True:
+            cached = await self.redis_client.get(summary_key)
+            if cached:
+                return game_files_adapter.validate_json(cached)
+
+            if await self.redis_client.set(
+                lock_key, token, nx=True, ex=SUMMARY_LOCK_TIMEOUT
+            ):
+                try:
+                    files = await self.file_manager.get_all_files(room)
+                    await self.redis_client.set(
+                        summary_key,
+                        game_files_adapter.dump_json(files),
+                        ex=SUMMARY_TTL,
+                    )
+                    return files
+                finally:
+                    await self._release_lock(keys=[lock_key], args=[token])
+
+            # Another worker is building it; its lock expires if it dies
+            await asyncio.sleep(SUMMARY_POLL_INTERVAL)
+
+
+summary_builder = SummaryBuilder()
+
+
+def get_summary_builder() -> SummaryBuilder:
+    return summary_builder
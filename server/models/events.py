@@ -0,0 +1,41 @@
+from enum import Enum
+
+from pydantic import BaseModel
+
+from .game import GameModel
+from .room import RoomModel
+from .types import FileKey, PlayerId, Waveform
+
+
+class RoomEventKind(str, Enum):
+    ROOM = 'room'
+    GAME = 'game'
+    CLIP = 'clip'
+
+
+class ClipReady(BaseModel):
+    """
+    A reversed clip that `recipient_id` will mimic in `round_number`, ready
+    before that round starts.
+    """
+
+    recipient_id: PlayerId
+    round_number: int
+    file_key: FileKey
+    waveform: Waveform | None = None
+
+
+class RoomEvent(BaseModel):
+    """
+    Published on `room:{code}:events` after every room or game mutation.
+
+    `version` comes from the room's shared counter, so subscribers can drop
+    stale or out-of-order events. A missing snapshot means it was deleted.
+    Clip events don't change the room and are not versioned.
+    """
+
+    kind: RoomEventKind
+    version: int
+    room: RoomModel | None = None
+    game: GameModel | None = None
+    clip: ClipReady | None = None
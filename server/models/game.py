@@ -6,3 +6,5 @@ from .types import RoomId
 class GameModel(BaseModel):
     room: RoomId
     round: int = 0
+    # Bumped on every change; see models.events.RoomEvent
+    version: int = 0
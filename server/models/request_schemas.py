@@ -1,9 +1,9 @@
 from enum import Enum
-from typing import Literal, Union
+from typing import Annotated, Literal, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
 
-from .types import B64Data, PlayerName, RoomId
+from .types import AudioTransport, B64Data, PlayerName, RoomId, SessionToken
 
 
 class RequestType(str, Enum):
@@ -12,6 +12,9 @@ class RequestType(str, Enum):
     LEAVE_ROOM = 'leave_room'
     START_GAME = 'start_game'
     UPLOAD_FILE = 'upload_file'
+    UPLOAD_START = 'upload_start'
+    NEGOTIATE = 'negotiate'
+    RESUME_SESSION = 'resume_session'
 
 
 class CreateRoomRequest(BaseModel):
@@ -39,18 +42,48 @@ class UploadFileRequest(BaseModel):
     round_number: int
 
 
-RequestMessage = Union[
-    CreateRoomRequest,
-    JoinRoomRequest,
-    StartGameRequest,
-    UploadFileRequest,
-    LeaveRoomRequest,
+class UploadStartRequest(BaseModel):
+    """
+    Announces a binary upload: `size` bytes follow as one or more binary frames.
+    """
+
+    type: Literal[RequestType.UPLOAD_START]
+    round_number: int
+    size: int
+
+
+class NegotiateRequest(BaseModel):
+    type: Literal[RequestType.NEGOTIATE]
+    audio_transport: AudioTransport = AudioTransport.BASE64
+
+
+class ResumeSessionRequest(BaseModel):
+    """
+    Reattach a new connection to the session of a dropped one. The client says
+    what it last saw so only what it missed is resent.
+    """
+
+    type: Literal[RequestType.RESUME_SESSION]
+    session_token: SessionToken
+    room_version: int = 0
+    # The round the client was in, or None if it was not in a game
+    round_number: int | None = None
+
+
+RequestMessage = Annotated[
+    Union[
+        CreateRoomRequest,
+        JoinRoomRequest,
+        StartGameRequest,
+        UploadFileRequest,
+        UploadStartRequest,
+        LeaveRoomRequest,
+        NegotiateRequest,
+        ResumeSessionRequest,
+    ],
+    Field(discriminator='type'),
 ]
 
-REQUEST_TYPE_MESSAGE_MAP: dict[RequestType, type[RequestMessage]] = {
-    RequestType.CREATE_ROOM: CreateRoomRequest,
-    RequestType.JOIN_ROOM: JoinRoomRequest,
-    RequestType.START_GAME: StartGameRequest,
-    RequestType.UPLOAD_FILE: UploadFileRequest,
-    RequestType.LEAVE_ROOM: LeaveRoomRequest,
-}
+# Validates raw JSON text in one pass, dispatching on `type` without trying each
+# member of the union
+request_message_adapter: TypeAdapter[RequestMessage] = TypeAdapter(RequestMessage)
@@ -4,7 +4,17 @@ from typing import Literal, Union
 from pydantic import BaseModel
 
 from .room import RoomModel
-from .types import B64Data, PlayerId
+from .types import (
+    AudioTransport,
+    B64Data,
+    FileUrl,
+    PlayerId,
+    SessionToken,
+    TransferId,
+    Waveform,
+)
+
+AudioRef = B64Data | TransferId | FileUrl
 
 
 class ResponseType(str, Enum):
@@ -14,19 +24,34 @@ class ResponseType(str, Enum):
     ROOM_LEFT = 'room_left'
     GAME_STARTED = 'game_started'
     GAME_ROUND = 'game_round'
+    ROUND_AUDIO = 'round_audio'
     GAME_SUMMARY = 'game_summary'
+    PROTOCOL_NEGOTIATED = 'protocol_negotiated'
+    AUDIO_TRANSFER = 'audio_transfer'
+    SESSION_RESUMED = 'session_resumed'
     ERROR = 'error'
 
 
 class RoomCreatedResponse(BaseModel):
     type: Literal[ResponseType.ROOM_CREATED] = ResponseType.ROOM_CREATED
     room: RoomModel
+    # Send in a resume_session request to reconnect as the same player
+    session_token: SessionToken | None = None
 
 
 class RoomJoinedResponse(BaseModel):
     type: Literal[ResponseType.ROOM_JOINED] = ResponseType.ROOM_JOINED
     room: RoomModel
     player_id: PlayerId
+    session_token: SessionToken | None = None
+
+
+class SessionResumedResponse(BaseModel):
+    type: Literal[ResponseType.SESSION_RESUMED] = ResponseType.SESSION_RESUMED
+    player_id: PlayerId
+    session_token: SessionToken
+    # Only set if the room changed since the version the client last saw
+    room: RoomModel | None = None
 
 
 class RoomUpdatedNotification(BaseModel):
@@ -42,18 +67,65 @@ class GameStartedResponse(BaseModel):
     type: Literal[ResponseType.GAME_STARTED] = ResponseType.GAME_STARTED
 
 
+class ProtocolNegotiatedResponse(BaseModel):
+    type: Literal[ResponseType.PROTOCOL_NEGOTIATED] = ResponseType.PROTOCOL_NEGOTIATED
+    audio_transport: AudioTransport
+    # Largest binary frame either side may send
+    max_frame_size: int
+    # Largest upload accepted, in bytes
+    max_upload_size: int
+
+
+class AudioTransferNotification(BaseModel):
+    """
+    Header for a binary download: `size` bytes follow in `frame_count` binary
+    frames. Transfers are always sent before the message that references them.
+    """
+
+    type: Literal[ResponseType.AUDIO_TRANSFER] = ResponseType.AUDIO_TRANSFER
+    transfer_id: TransferId
+    size: int
+    frame_count: int
+
+
 class GameRoundNotification(BaseModel):
     type: Literal[ResponseType.GAME_ROUND] = ResponseType.GAME_ROUND
     round_number: int
-    audio: B64Data | None
+    # Base64 audio, a transfer id when audio_transport is binary, or a signed
+    # URL when it is url
+    audio: AudioRef | None
+    audio_transport: AudioTransport = AudioTransport.BASE64
+    # The clip was already sent in a round_audio message for this round
+    audio_prefetched: bool = False
+    # Peaks of the clip (0-255), to draw before its audio has loaded
+    waveform: Waveform | None = None
+
+
+class RoundAudioNotification(BaseModel):
+    """
+    The clip to mimic in `round_number`, pushed as soon as it is ready so the
+    client holds it before the round starts.
+    """
+
+    type: Literal[ResponseType.ROUND_AUDIO] = ResponseType.ROUND_AUDIO
+    round_number: int
+    # Encoded as in GameRoundNotification.audio
+    audio: AudioRef
+    audio_transport: AudioTransport = AudioTransport.BASE64
+    waveform: Waveform | None = None
 
 
 class GameSummaryNotification(BaseModel):
     type: Literal[ResponseType.GAME_SUMMARY] = ResponseType.GAME_SUMMARY
 
-    # 2d array of (player_id, original_file, reversed_file),
-    # outer array is by starting player, inner array is by round
-    files: list[list[tuple[PlayerId, B64Data | None, B64Data | None]]]
+    # 2d array of (player_id, original_file, reversed_file, waveform),
+    # outer array is by starting player, inner array is by round.
+    # Files are encoded as in GameRoundNotification.audio; the waveform is the
+    # original's, so the reversed file's is the same list backwards
+    files: list[
+        list[tuple[PlayerId, AudioRef | None, AudioRef | None, Waveform | None]]
+    ]
+    audio_transport: AudioTransport = AudioTransport.BASE64
 
 
 class ErrorResponse(BaseModel):
@@ -68,6 +140,10 @@ ResponseMessage = Union[
     RoomLeftResponse,
     GameStartedResponse,
     GameRoundNotification,
+    RoundAudioNotification,
     GameSummaryNotification,
+    ProtocolNegotiatedResponse,
+    AudioTransferNotification,
+    SessionResumedResponse,
     ErrorResponse,
 ]
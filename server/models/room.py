@@ -8,3 +8,5 @@ class RoomModel(BaseModel):
     player_ids: list[PlayerId]
     player_names: dict[PlayerId, PlayerName]
     host_id: PlayerId
+    # Bumped on every change; see models.events.RoomEvent
+    version: int = 0
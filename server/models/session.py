@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+
+from .types import PlayerId, RoomId
+
+
+class SessionModel(BaseModel):
+    """
+    Stored under `session:{token}` so a dropped connection can resume as the
+    same player.
+    """
+
+    player_id: PlayerId
+    room_code: RoomId
+    # The connection currently attached; only it may detach the session
+    connection_id: str
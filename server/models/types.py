@@ -1,9 +1,29 @@
+from enum import Enum
 from typing import Annotated
 
 from pydantic import constr
 
 PlayerId = str
 PlayerName = str
-RoomId = Annotated[str, constr(pattern=r'^[A-Z]{4}$')]
+# Four letters from the code pool, or six when the pool runs low
+RoomId = Annotated[str, constr(pattern=r'^[A-Z]{4,6}$')]
 FileUrl = str
+FileKey = str
 B64Data = str
+TransferId = str
+SessionToken = str
+# Peak amplitude of equal slices of a clip, 0-255 of full scale
+Waveform = list[int]
+
+# 2d array of (player_id, original_file, reversed_file, waveform),
+# outer array is by starting player, inner array is by round
+GameFiles = list[list[tuple[PlayerId, FileKey | None, FileKey | None, Waveform | None]]]
+
+
+class AudioTransport(str, Enum):
+    # Audio inlined as base64 strings in JSON messages
+    BASE64 = 'base64'
+    # Audio sent as raw binary WebSocket frames announced by a JSON header
+    BINARY = 'binary'
+    # Signed HTTP URLs to GET /audio/; uploads use binary frames
+    URL = 'url'